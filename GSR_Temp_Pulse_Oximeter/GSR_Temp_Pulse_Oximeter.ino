@@ -25,10 +25,65 @@ int b=0;
 int c=0;
 int d=0;
 
+// Set to 1 to stream compact binary frames instead of text lines.
+// Frame (15 bytes, little-endian): A5 5A | seq u16 | gsr u16 | ir u32 | red u32 | crc8
+// Decoded on the PC side by binary_protocol.py; 100 frames/sec needs at least
+// 19200 baud (1500 bytes/sec), so pick a faster rate on the dashboard
+#define BINARY_FRAMES 0
+#define FRAME_INTERVAL_MS 10
+uint16_t frameSeq = 0;
+unsigned long nextFrame = 0;
+
+uint8_t crc8(const uint8_t *data, uint8_t len) {
+  uint8_t crc = 0;
+  while (len--) {
+    crc ^= *data++;
+    for (uint8_t i = 0; i < 8; i++)
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+  }
+  return crc;
+}
+
+void sendFrame(uint16_t gsr, uint32_t ir, uint32_t red) {
+  uint8_t frame[15];
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  frame[2] = frameSeq & 0xFF;
+  frame[3] = frameSeq >> 8;
+  frame[4] = gsr & 0xFF;
+  frame[5] = gsr >> 8;
+  for (uint8_t i = 0; i < 4; i++) {
+    frame[6 + i] = (ir >> (8 * i)) & 0xFF;
+    frame[10 + i] = (red >> (8 * i)) & 0xFF;
+  }
+  frame[14] = crc8(frame + 2, 12);
+  Serial.write(frame, sizeof(frame));
+  frameSeq++;
+}
+
 
 void setup() {
 
 Serial.begin(9600);
+  // The host may ask for a faster link right after opening the port
+  // (serial_reader.negotiate_baud): BAUD=<rate> -> "BAUD OK <rate>", then switch
+  unsigned long waitStart = millis();
+  while (millis() - waitStart < 2000) {
+    if (Serial.available()) {
+      String cmd = Serial.readStringUntil('\n');
+      if (cmd.startsWith("BAUD=")) {
+        long baud = cmd.substring(5).toInt();
+        if (baud > 0) {
+          Serial.print("BAUD OK ");
+          Serial.println(baud);
+          Serial.flush();
+          Serial.end();
+          Serial.begin(baud);
+        }
+        break;
+      }
+    }
+  }
   dht.begin();
 // Initialize MAX30102 Sensor
   if (!particleSensor.begin(Wire, I2C_SPEED_STANDARD)) {
@@ -58,6 +113,17 @@ lcd.setCursor(0,0);
 
 void loop() {
 
+#if BINARY_FRAMES
+  // Raw GSR/IR/Red samples at a fixed rate; no text, no LCD refresh.
+  // Paced on millis() so the sensor reads do not stretch the interval:
+  // the PC side times samples by sequence number (binary_protocol.SAMPLE_RATE)
+  if ((long)(millis() - nextFrame) > FRAME_INTERVAL_MS) nextFrame = millis();  // first frame or a stall
+  while ((long)(millis() - nextFrame) < 0);
+  nextFrame += FRAME_INTERVAL_MS;
+  sendFrame(analogRead(A3) / 2, particleSensor.getIR(), particleSensor.getRed());
+  return;
+#endif
+
 float conductivevoltage;
 sensorValue=analogRead(A3);
 conductivevoltage = sensorValue*(5.0/1023.0);
@@ -397,10 +397,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
-import serial
-import serial.tools.list_ports
 from datetime import datetime
-import plotly.express as px
+from serial_reader import SerialReader, BAUD_RATES, negotiate_baud
+from ring_buffer import RingBuffer
+from frame_assembler import FrameAssembler
+from live_stats import SessionStats, stress_level
+from artifacts import ArtifactDetector, NO_CONTACT, NOT_FITTED, clean, describe_flags
+from session_store import SessionStore
+from exports import EXPORT_FORMATS, constant, export, export_chunks
 
 # Configure page
 st.set_page_config(
@@ -447,10 +451,45 @@ st.markdown("""
 
 st.title("🏅 Olympic Analytics + Biometric Monitoring")
 
+@st.cache_resource
+def get_session_store():
+    # One SQLite connection per server process, shared by all browser sessions
+    return SessionStore()
+
+def processed_chunks(store, session_id):
+    # Processed export rows for a stored session, one store chunk at a time;
+    # per-session constants are single-category columns
+    info = store.session(session_id)
+    started = datetime.fromtimestamp(info['started']).strftime("%Y-%m-%d %H:%M:%S")
+    baseline = {k: np.nan if info[k] is None else info[k] for k in ('baseline_gsr', 'baseline_pulse', 'baseline_oxygen')}
+    for chunk in store.iter_samples(session_id=session_id):
+        n = len(chunk)
+        yield pd.DataFrame({
+            'Athlete': constant(info['athlete'], n),
+            'Age': np.full(n, info['age']),
+            'Gender': constant(info['gender'], n),
+            'Timestamp': constant(started, n),
+            'Time_Elapsed': chunk['time'].to_numpy() - info['started'],
+            'GSR': chunk['gsr'].to_numpy(),
+            'Heart_Rate': chunk['pulse'].to_numpy(),
+            'Oxygen_Saturation': chunk['oxygen'].to_numpy(),
+            'Quality_Flags': chunk['quality'].to_numpy(),
+            'Baseline_GSR': np.full(n, baseline['baseline_gsr']),
+            'Baseline_Heart_Rate': np.full(n, baseline['baseline_pulse']),
+            'Baseline_Oxygen': np.full(n, baseline['baseline_oxygen'])
+        })
+
+def raw_chunks(store, session_id):
+    info = store.session(session_id)
+    started = datetime.fromtimestamp(info['started']).strftime("%Y-%m-%d %H:%M:%S")
+    for chunk in store.iter_raw(session_id):
+        yield pd.DataFrame({'Timestamp': constant(started, len(chunk)), 'Raw_Data': chunk['line'].to_numpy()})
+
 # Navigation sidebar
 nav = st.sidebar.radio("**Navigation**", [
     '🏠 Home', 
     '💓 Stress-O2-Pulse Monitoring',
+    '👥 Squad Monitoring',
     '⚖️ BMI Calculator'
 ])
 
@@ -472,6 +511,10 @@ if nav == '🏠 Home':
 
 # Biometric Monitoring Page
 elif nav == '💓 Stress-O2-Pulse Monitoring':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
+    from live_chart import StreamingChart
     st.header("💓 Athlete Biometric Monitoring")
     
     # Athlete Information Section
@@ -511,50 +554,97 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         st.warning("Please enter athlete information before starting monitoring")
         st.stop()
 
+    # Previously recorded sessions for this athlete
+    with st.expander("📚 Session History"):
+        history = get_session_store().sessions(st.session_state.athlete['name'])
+        if history.empty:
+            st.info("No recorded sessions for this athlete yet")
+        else:
+            history['started'] = pd.to_datetime(history['started'], unit='s')
+            st.dataframe(history, hide_index=True, use_container_width=True)
+            started = dict(zip(history['id'], history['started']))
+            past_id = st.selectbox("Show session", list(started), format_func=lambda i: f"{started[i]:%Y-%m-%d %H:%M:%S}")
+            past = get_session_store().samples(session_id=past_id)
+            if not past.empty:
+                past['time'] -= past['time'].iloc[0]
+                fig = px.line(past, x='time', y=['gsr', 'pulse', 'oxygen'],
+                              labels={'time': 'Time (s)', 'value': 'Measurement', 'variable': 'Metric'})
+                st.plotly_chart(fig, use_container_width=True)
+
     # Biometric Monitoring Section
     st.subheader("📊 Real-Time Monitoring")
     
     # Device Connection
     ports = [port.device for port in serial.tools.list_ports.comports()]
+    # Simulated devices (python simulator.py devices) are pseudo-terminals that
+    # comports() does not list, so their path can be typed in
+    manual_port = st.text_input("Device path (optional)", placeholder="/dev/pts/3")
+    if manual_port:
+        ports = [manual_port] + ports
     if not ports:
-        st.error("No serial devices detected. Please connect your sensor device.")
+        st.error("No serial devices detected. Please connect your sensor device or enter its path.")
         st.stop()
     
     port = st.selectbox("Select Device Port", ports)
-    
+    chart_refresh = st.slider("Chart refresh interval (seconds)", 0.5, 5.0, 2.0, 0.5)
+    ingestion_mode = st.radio("Ingestion mode", ["Line by line (9600 baud)", "Bulk reads", "Binary frames (raw PPG)"],
+                              horizontal=True)
+    bulk = ingestion_mode == "Bulk reads"
+    # Sketch built with BINARY_FRAMES 1: heart rate is extracted from the raw IR samples
+    binary = ingestion_mode == "Binary frames (raw PPG)"
+    baud = st.selectbox("Baud rate", BAUD_RATES, index=BAUD_RATES.index(115200)) if bulk or binary else 9600
+    export_format = st.radio("Export format", list(EXPORT_FORMATS), horizontal=True)
+
     if st.button("▶ Start Monitoring Session", type="primary"):
         try:
             # Initialize connection
             ser = serial.Serial(port, 9600, timeout=1)
             st.session_state.ser = ser
             st.success(f"Connected to {port}")
+            if baud != ser.baudrate:
+                if negotiate_baud(ser, baud):
+                    st.info(f"Switched link to {baud} baud")
+                else:
+                    st.warning(f"Device did not accept {baud} baud, staying at {ser.baudrate}")
+            
+            # Drain the port on a background thread so slow renders never stall ingestion
+            reader = SerialReader(ser, bulk=bulk, binary=binary).start()
+            st.session_state.reader = reader
+            
+            # Persist the session as it is recorded
+            store = get_session_store()
+            session_id = store.start_session(st.session_state.athlete['name'],
+                                             st.session_state.athlete['age'],
+                                             st.session_state.athlete['gender'])
             
             # Initialize data storage
             if 'biometrics' not in st.session_state:
                 st.session_state.biometrics = {
-                    'time': [],
-                    'gsr': [],
-                    'pulse': [],
-                    'oxygen': [],
+                    # One row per device cycle, capped so memory stays flat in day-long sessions
+                    'samples': RingBuffer(capacity=100_000),
                     'raw_data': []
                 }
+            samples = st.session_state.biometrics['samples']
             
             # Create real-time display
             st.divider()
             
             # Metrics display
-            col1, col2, col3 = st.columns(3)
-            with col1:
+            cols = st.columns(4 if binary else 3)
+            with cols[0]:
                 gsr_card = st.empty()
-            with col2:
+            with cols[1]:
                 pulse_card = st.empty()
-            with col3:
+            with cols[2]:
                 oxygen_card = st.empty()
+            # Heart-rate variability needs beat-to-beat intervals, only available from raw PPG
+            hrv_card = cols[3].empty() if binary else None
             
             status_card = st.empty()
             chart = st.empty()
             raw_data_expander = st.expander("📝 Raw Device Data")
             raw_data_container = raw_data_expander.empty()
+            ingest_rate = raw_data_expander.empty()
             
             # Monitoring loop
             start_time = time.time()
@@ -568,8 +658,16 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
             # Baseline phase
             status_text.text("🔵 Baseline measurement in progress (5 seconds)...")
             baseline_start = time.time()
-            baseline_values = {'gsr': [], 'pulse': [], 'oxygen': []}
             raw_data_list = []
+            if binary:
+                from ppg import PpgAssembler, describe_quality, frame_lines
+                assembler = PpgAssembler(decoder=reader.decoder)
+            else:
+                assembler = FrameAssembler()
+            stats = SessionStats()
+            # Flagged readings (no contact, motion spikes, flat-lines) become gaps
+            # before they reach the baseline, the statistics, the chart and the store
+            detector = ArtifactDetector()
             
             while time.time() < baseline_start + baseline_duration:
                 # Update progress
@@ -577,42 +675,45 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                 progress = min(elapsed / total_duration, 1.0)
                 progress_bar.progress(progress)
                 
-                # Read serial data for baseline
-                if ser.in_waiting:
-                    line = ser.readline().decode('utf-8').strip()
+                # Consume every line the reader thread has collected
+                if binary:
+                    times, raw_frames = reader.drain_frames()
+                    assembler.feed(times, raw_frames)
+                    timed_lines = list(zip(times.tolist(), frame_lines(raw_frames)))
+                else:
+                    timed_lines = reader.drain_timed()
+                store.add_raw(session_id, timed_lines)
+                for t, line in timed_lines:
                     raw_data_list.append(line)
                     st.session_state.biometrics['raw_data'].append(line)
-                    
-                    # Process different metrics for baseline
-                    if line.startswith("GSR="):
-                        try:
-                            gsr = int(line.split('=')[1].split()[0])
-                            baseline_values['gsr'].append(gsr)
-                        except:
-                            continue
-                    
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse = int(line.split(':')[1])
-                            baseline_values['pulse'].append(pulse)
-                        except:
-                            continue
-                    
-                    elif line.startswith("O2:"):
-                        try:
-                            oxygen = float(line.split(':')[1].replace('%', ''))
-                            baseline_values['oxygen'].append(oxygen)
-                        except:
-                            continue
+                    if not binary:
+                        assembler.feed(t, line)
+                
+                # Collect baseline readings from completed device cycles
+                frames = assembler.pop_frames()
+                stats.add_baseline(clean(frames, detector.update(frames)))
                 
                 # Update raw data display
                 raw_data_container.text("\n".join(raw_data_list[-20:]))  # Show last 20 lines
+                if reader.error:
+                    raise reader.error
                 time.sleep(0.1)
             
-            # Calculate baseline averages
-            baseline_gsr = np.mean(baseline_values['gsr']) if baseline_values['gsr'] else 0
-            baseline_pulse = np.mean(baseline_values['pulse']) if baseline_values['pulse'] else 0
-            baseline_oxygen = np.mean(baseline_values['oxygen']) if baseline_values['oxygen'] else 0
+            # Robust baseline (median, MAD spread) per channel
+            baseline = {name: 0 if np.isnan(value) else value for name, value in stats.fix_baseline().items()}
+            baseline_gsr, baseline_pulse, baseline_oxygen = baseline['gsr'], baseline['pulse'], baseline['oxygen']
+            store.set_baseline(session_id, baseline_gsr, baseline_pulse, baseline_oxygen)
+            
+            # Live chart: built once, then only fed new points
+            live_chart = StreamingChart(
+                {'GSR': '#1f77b4', 'Pulse': '#ff7f0e', 'Oxygen': '#2ca02c'},
+                title='Real-Time Biometrics',
+                refresh_interval=chart_refresh
+            )
+            live_chart.add_baseline(baseline_gsr, "#1f77b4", f"GSR Baseline: {baseline_gsr:.1f}",
+                                    annotation_position="bottom right")
+            live_chart.add_baseline(baseline_pulse, "#ff7f0e", f"Pulse Baseline: {baseline_pulse:.1f}")
+            live_chart.add_baseline(baseline_oxygen, "#2ca02c", f"O2 Baseline: {baseline_oxygen:.1f}")
             
             # Reading phase
             status_text.text("🔴 Active monitoring in progress (10 seconds)...")
@@ -626,123 +727,132 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                 remaining = max(0, total_duration - elapsed)
                 status_text.text(f"Time remaining: {int(remaining)} seconds")
                 
-                # Read serial data
-                if ser.in_waiting:
-                    line = ser.readline().decode('utf-8').strip()
+                # Consume every line the reader thread has collected
+                if binary:
+                    times, raw_frames = reader.drain_frames()
+                    assembler.feed(times, raw_frames)
+                    timed_lines = list(zip(times.tolist(), frame_lines(raw_frames)))
+                else:
+                    timed_lines = reader.drain_timed()
+                store.add_raw(session_id, timed_lines)
+                for t, line in timed_lines:
                     raw_data_list.append(line)
                     st.session_state.biometrics['raw_data'].append(line)
+                    if not binary:
+                        assembler.feed(t, line)
+                
+                # Store completed device cycles as aligned rows
+                frames = assembler.pop_frames()
+                frames = clean(frames, detector.update(frames))
+                if len(frames['time']):
+                    samples.extend(frames['time'] - start_time,
+                                   gsr=frames['gsr'], pulse=frames['pulse'], oxygen=frames['oxygen'])
+                    store.add_samples(session_id, st.session_state.athlete['name'], frames['time'],
+                                      frames['gsr'], frames['pulse'], frames['oxygen'], frames['quality'])
+                    stats.update(frames)
+                    live_chart.extend('GSR', frames['t_gsr'] - start_time, frames['gsr'])
+                    live_chart.extend('Pulse', frames['t_pulse'] - start_time, frames['pulse'])
+                    live_chart.extend('Oxygen', frames['t_oxygen'] - start_time, frames['oxygen'])
+                    
+                    gsr = assembler.latest['gsr']
+                    pulse = assembler.latest['pulse']
+                    oxygen = assembler.latest['oxygen']
+                    gsr_z = stats['gsr'].zscore()
+                    gsr_flags = detector.latest['gsr']
+                    
+                    if gsr is not None:
+                        quality_note = f"<p>Signal: {describe_flags(gsr_flags)}</p>" if gsr_flags else ""
+                        with gsr_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>GSR</h3>
+                                <h1>{gsr:.0f} µS</h1>
+                                <p>Baseline: {baseline_gsr:.1f} µS · z {gsr_z:+.1f}</p>
+                                {quality_note}
+                            </div>
+                            """, unsafe_allow_html=True)
                     
-                    # Process different metrics
-                    if line.startswith("GSR="):
-                        try:
-                            gsr = int(line.split('=')[1].split()[0])
-                            st.session_state.biometrics['gsr'].append(gsr)
-                            st.session_state.biometrics['time'].append(elapsed)
-                            
-                            with gsr_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>GSR</h3>
-                                    <h1>{gsr} µS</h1>
-                                    <p>Baseline: {baseline_gsr:.1f} µS</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # Stress assessment
-                                if abs(gsr - baseline_gsr) < 50:
-                                    status_card.success("😊 Normal Stress Levels")
-                                elif abs(gsr - baseline_gsr) < 150:
-                                    status_card.warning("😐 Elevated Stress")
-                                else:
-                                    status_card.error("😨 High Stress Alert")
-                        
-                        except:
-                            continue
+                    # Stress assessment on the short rolling mean, in baseline deviations;
+                    # no assessment while the electrodes are off the skin
+                    if gsr_flags & (NO_CONTACT | NOT_FITTED):
+                        status_card.warning(f"✋ Place fingers on the GSR sensor ({describe_flags(gsr_flags)})")
+                    elif gsr is not None:
+                        level = stress_level(gsr_z)
+                        if level == 0:
+                            status_card.success("😊 Normal Stress Levels")
+                        elif level == 1:
+                            status_card.warning("😐 Elevated Stress")
+                        else:
+                            status_card.error("😨 High Stress Alert")
                     
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse = int(line.split(':')[1])
-                            st.session_state.biometrics['pulse'].append(pulse)
-                            
-                            with pulse_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>Heart Rate</h3>
-                                    <h1>{pulse} BPM</h1>
-                                    <p>Baseline: {baseline_pulse:.1f} BPM</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        except:
-                            continue
+                    if pulse is not None:
+                        with pulse_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>Heart Rate</h3>
+                                <h1>{pulse:.0f} BPM</h1>
+                                <p>Baseline: {baseline_pulse:.1f} BPM</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                     
-                    elif line.startswith("O2:"):
-                        try:
-                            oxygen = float(line.split(':')[1].replace('%', ''))
-                            st.session_state.biometrics['oxygen'].append(oxygen)
-                            
-                            with oxygen_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>Oxygen Saturation</h3>
-                                    <h1>{oxygen}%</h1>
-                                    <p>Baseline: {baseline_oxygen:.1f}%</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        except:
-                            continue
+                    if oxygen is not None:
+                        signal_note = f"<p>Signal: {describe_quality(assembler.oximeter.flags)}</p>" if binary else ""
+                        with oxygen_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>Oxygen Saturation</h3>
+                                <h1>{oxygen:.0f}%</h1>
+                                <p>Baseline: {baseline_oxygen:.1f}%</p>
+                                {signal_note}
+                            </div>
+                            """, unsafe_allow_html=True)
+                    
+                    if binary:
+                        hrv = assembler.hrv.metrics()
+                        lf, hf, lf_hf = assembler.hrv.spectrum()
+                        # The spectrum needs min_spectrum seconds of beats, longer than a short session
+                        lf_hf_text = "collecting…" if np.isnan(lf_hf) else f"{lf_hf:.2f}"
+                        with hrv_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>HRV</h3>
+                                <h1>{hrv['rmssd']:.0f} ms</h1>
+                                <p>RMSSD · SDNN {hrv['sdnn']:.0f} ms · pNN50 {hrv['pnn50']:.0f}%</p>
+                                <p>LF/HF: {lf_hf_text}</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                 
                 # Update raw data display
                 raw_data_container.text("\n".join(raw_data_list[-20:]))
+                bytes_rate, lines_rate = reader.rates()
+                ingest_rate.caption(f"{bytes_rate:,.0f} bytes/sec · {lines_rate:,.0f} lines/sec · {reader.dropped} dropped")
                 
-                # Update chart every 2 seconds
-                if len(st.session_state.biometrics['time']) > 1 and time.time() % 2 < 0.1:
-                    df = pd.DataFrame({
-                        'Time': st.session_state.biometrics['time'],
-                        'GSR': st.session_state.biometrics['gsr'],
-                        'Pulse': st.session_state.biometrics['pulse'][:len(st.session_state.biometrics['time'])],
-                        'Oxygen': st.session_state.biometrics['oxygen'][:len(st.session_state.biometrics['time'])]
-                    })
-                    
-                    fig = px.line(df, x='Time', y=['GSR', 'Pulse', 'Oxygen'],
-                                title='Real-Time Biometrics',
-                                labels={'value': 'Measurement', 'variable': 'Metric'},
-                                color_discrete_map={
-                                    'GSR': '#1f77b4',
-                                    'Pulse': '#ff7f0e', 
-                                    'Oxygen': '#2ca02c'
-                                })
-                    
-                    # Add baseline reference lines
-                    fig.add_hline(y=baseline_gsr, line_dash="dot", line_color="#1f77b4", 
-                                  annotation_text=f"GSR Baseline: {baseline_gsr:.1f}", 
-                                  annotation_position="bottom right")
-                    fig.add_hline(y=baseline_pulse, line_dash="dot", line_color="#ff7f0e", 
-                                  annotation_text=f"Pulse Baseline: {baseline_pulse:.1f}")
-                    fig.add_hline(y=baseline_oxygen, line_dash="dot", line_color="#2ca02c", 
-                                  annotation_text=f"O2 Baseline: {baseline_oxygen:.1f}")
-                    
-                    fig.update_layout(
-                        yaxis_range=[0, max(
-                            max(st.session_state.biometrics['gsr'] + [100]),
-                            max(st.session_state.biometrics['pulse'] + [100]),
-                            100
-                        )],
-                        legend=dict(orientation="h", y=1.1),
-                        hovermode="x unified"
-                    )
-                    
-                    chart.plotly_chart(fig, use_container_width=True)
+                # Push new points to the chart at the configured cadence
+                live_chart.render(chart)
                 
+                if reader.error:
+                    raise reader.error
                 time.sleep(0.1)
             
+            live_chart.render(chart, force=True)
+            store.flush()
+            
             # Session complete
             st.balloons()
             st.success("Monitoring session completed!")
             
             # Calculate summary statistics
-            final_gsr = st.session_state.biometrics['gsr'][-1] if st.session_state.biometrics['gsr'] else 0
-            final_pulse = st.session_state.biometrics['pulse'][-1] if st.session_state.biometrics['pulse'] else 0
-            final_oxygen = st.session_state.biometrics['oxygen'][-1] if st.session_state.biometrics['oxygen'] else 0
+            final_gsr = samples.last('gsr')
+            final_pulse = samples.last('pulse')
+            final_oxygen = samples.last('oxygen')
+            hrv_row = ""
+            if binary:
+                hrv = assembler.hrv.metrics()
+                lf_hf = assembler.hrv.spectrum()[2]
+                lf_hf_text = (f"not enough data (needs {assembler.hrv.min_spectrum:.0f} s of beats)"
+                              if np.isnan(lf_hf) else f"{lf_hf:.2f}")
+                hrv_row = (f"<tr><td><strong>HRV:</strong></td><td>RMSSD {hrv['rmssd']:.0f} ms · "
+                           f"SDNN {hrv['sdnn']:.0f} ms · pNN50 {hrv['pnn50']:.0f}% · LF/HF {lf_hf_text}</td></tr>")
             
             # Display summary in a highlight box
             st.markdown(f"""
@@ -753,32 +863,14 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                     <tr><td><strong>Final Pulse:</strong></td><td>{final_pulse} BPM (Baseline: {baseline_pulse:.1f} BPM)</td></tr>
                     <tr><td><strong>Final Oxygen:</strong></td><td>{final_oxygen}% (Baseline: {baseline_oxygen:.1f}%)</td></tr>
                     <tr><td><strong>Duration:</strong></td><td>{total_duration} seconds</td></tr>
-                    <tr><td><strong>Data Points:</strong></td><td>{len(st.session_state.biometrics['time'])} readings</td></tr>
+                    <tr><td><strong>Data Points:</strong></td><td>{len(samples)} readings</td></tr>
+                    <tr><td><strong>Malformed Lines:</strong></td><td>{assembler.malformed}</td></tr>
+                    <tr><td><strong>Rejected Readings:</strong></td><td>GSR {detector.rejected['gsr']} · Pulse {detector.rejected['pulse']} · O2 {detector.rejected['oxygen']}</td></tr>
+                    {hrv_row}
                 </table>
             </div>
             """, unsafe_allow_html=True)
             
-            # Prepare data for download
-            session_data = pd.DataFrame({
-                'Athlete': [st.session_state.athlete['name']] * len(st.session_state.biometrics['time']),
-                'Age': [st.session_state.athlete['age']] * len(st.session_state.biometrics['time']),
-                'Gender': [st.session_state.athlete['gender']] * len(st.session_state.biometrics['time']),
-                'Timestamp': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")] * len(st.session_state.biometrics['time']),
-                'Time_Elapsed': st.session_state.biometrics['time'],
-                'GSR': st.session_state.biometrics['gsr'],
-                'Heart_Rate': st.session_state.biometrics['pulse'],
-                'Oxygen_Saturation': st.session_state.biometrics['oxygen'],
-                'Baseline_GSR': [baseline_gsr] * len(st.session_state.biometrics['time']),
-                'Baseline_Heart_Rate': [baseline_pulse] * len(st.session_state.biometrics['time']),
-                'Baseline_Oxygen': [baseline_oxygen] * len(st.session_state.biometrics['time'])
-            })
-            
-            # Create a second DataFrame for raw data
-            raw_data_df = pd.DataFrame({
-                'Timestamp': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")] * len(st.session_state.biometrics['raw_data']),
-                'Raw_Data': st.session_state.biometrics['raw_data']
-            })
-            
             # Create a summary DataFrame
             summary_df = pd.DataFrame({
                 'Metric': ['GSR', 'Heart Rate', 'Oxygen Saturation'],
@@ -789,42 +881,148 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                     ((final_gsr - baseline_gsr)/baseline_gsr)*100 if baseline_gsr != 0 else 0,
                     ((final_pulse - baseline_pulse)/baseline_pulse)*100 if baseline_pulse != 0 else 0,
                     ((final_oxygen - baseline_oxygen)/baseline_oxygen)*100 if baseline_oxygen != 0 else 0
-                ]
+                ],
+                'Session_Mean': [stats[name].total.mean for name in ('gsr', 'pulse', 'oxygen')],
+                'Session_SD': [stats[name].total.std for name in ('gsr', 'pulse', 'oxygen')]
             })
             
-            # Create download buttons
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.download_button(
-                    "💾 Download Processed Data (CSV)",
-                    session_data.to_csv(index=False),
-                    f"processed_biometrics_{st.session_state.athlete['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    "text/csv"
-                )
-            with col2:
-                st.download_button(
-                    "📋 Download Raw Data (CSV)",
-                    raw_data_df.to_csv(index=False),
-                    f"raw_biometrics_{st.session_state.athlete['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    "text/csv"
-                )
-            with col3:
-                st.download_button(
-                    "📊 Download Summary Report (CSV)",
-                    summary_df.to_csv(index=False),
-                    f"summary_biometrics_{st.session_state.athlete['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    "text/csv"
-                )
+            # Processed and raw data are exported from the session store on request (below)
+            st.session_state.last_session_id = session_id
+            data, ext, mime = export(summary_df, export_format, categorical=['Metric'])
+            st.download_button(
+                f"📊 Download Summary Report ({export_format})",
+                data,
+                f"summary_biometrics_{st.session_state.athlete['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}",
+                mime
+            )
             
         except Exception as e:
             st.error(f"Error: {str(e)}")
         
         finally:
+            get_session_store().flush()
+            if 'reader' in st.session_state:
+                st.session_state.reader.stop()
+                del st.session_state.reader
             if 'ser' in st.session_state:
                 st.session_state.ser.close()
                 del st.session_state.ser
                 st.warning("Disconnected from device")
 
+    # Downloads for the last recorded session. Nothing is serialized on a
+    # rerun unless asked for; rows are then streamed from the session store
+    # chunk by chunk into a temporary file.
+    if 'last_session_id' in st.session_state:
+        st.subheader("⬇️ Export Last Session")
+        if st.button(f"📦 Prepare Processed and Raw Data ({export_format})"):
+            store = get_session_store()
+            session_id = st.session_state.last_session_id
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            col1, col2 = st.columns(2)
+            with col1:
+                data, ext, mime = export_chunks(processed_chunks(store, session_id), export_format)
+                st.download_button(
+                    f"💾 Download Processed Data ({export_format})",
+                    data,
+                    f"processed_biometrics_{st.session_state.athlete['name']}_{stamp}.{ext}",
+                    mime
+                )
+            with col2:
+                data, ext, mime = export_chunks(raw_chunks(store, session_id), export_format)
+                st.download_button(
+                    f"📋 Download Raw Data ({export_format})",
+                    data,
+                    f"raw_biometrics_{st.session_state.athlete['name']}_{stamp}.{ext}",
+                    mime
+                )
+
+# Squad Monitoring Page
+elif nav == '👥 Squad Monitoring':
+    import serial
+    import serial.tools.list_ports
+    from device_manager import DeviceManager
+    st.header("👥 Squad Monitoring")
+    
+    ports = [port.device for port in serial.tools.list_ports.comports()]
+    manual_ports = st.text_input("Extra device paths (optional, comma separated)", placeholder="/dev/pts/3, /dev/pts/4")
+    ports += [path.strip() for path in manual_ports.split(',') if path.strip()]
+    if not ports:
+        st.error("No serial devices detected. Please connect your sensor devices or enter their paths.")
+        st.stop()
+    
+    # One row per port; leave the athlete blank to skip a device
+    roster = st.data_editor(
+        pd.DataFrame({'Port': ports, 'Athlete': [f"Athlete {i + 1}" for i in range(len(ports))]}),
+        disabled=['Port'],
+        hide_index=True,
+        use_container_width=True
+    )
+    session_length = st.number_input("Session length (seconds)", min_value=10, max_value=3600, value=60)
+    
+    if st.button("▶ Start Squad Session", type="primary"):
+        devices = {row.Port: row.Athlete.strip() for row in roster.itertuples() if row.Athlete and row.Athlete.strip()}
+        if not devices:
+            st.warning("Assign at least one athlete to a port")
+            st.stop()
+        names = list(devices.values())
+        repeated = sorted({name for name in names if names.count(name) > 1})
+        if repeated:
+            st.warning(f"Each athlete can only be assigned to one port: {', '.join(repeated)}")
+            st.stop()
+        
+        manager = DeviceManager(devices).start()
+        athletes = list(devices.values())
+        
+        # Live card grid, four athletes per row
+        cards = {}
+        for i in range(0, len(athletes), 4):
+            for col, athlete in zip(st.columns(4), athletes[i:i + 4]):
+                cards[athlete] = col.empty()
+        progress_bar = st.progress(0)
+        shown = {}
+        
+        try:
+            start_time = time.time()
+            while time.time() < start_time + session_length:
+                manager.poll(start_time)
+                
+                # Only redraw cards whose readings changed
+                for athlete, card in cards.items():
+                    latest = manager.latest(athlete)
+                    state = (manager.status(athlete), latest['gsr'], latest['pulse'], latest['oxygen'])
+                    if shown.get(athlete) == state:
+                        continue
+                    shown[athlete] = state
+                    status, gsr, pulse, oxygen = state
+                    card.markdown(f"""
+                    <div class="metric-card">
+                        <h3>{athlete}</h3>
+                        <p>GSR: <strong>{'-' if gsr is None else f'{gsr:.0f} µS'}</strong></p>
+                        <p>Pulse: <strong>{'-' if pulse is None else f'{pulse:.0f} BPM'}</strong></p>
+                        <p>O₂: <strong>{'-' if oxygen is None else f'{oxygen:.0f}%'}</strong></p>
+                        <p><em>{status}</em></p>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                progress_bar.progress(min((time.time() - start_time) / session_length, 1.0))
+                time.sleep(0.25)
+        finally:
+            manager.stop()
+        
+        st.success("✅ Squad session completed!")
+        summary = pd.DataFrame([{
+            'Athlete': athlete,
+            'Status': manager.status(athlete),
+            'Readings': len(manager.samples[athlete]),
+            'Avg GSR': np.nanmean(manager.samples[athlete].view('gsr')) if len(manager.samples[athlete]) else None,
+            'Avg Pulse': np.nanmean(manager.samples[athlete].view('pulse')) if len(manager.samples[athlete]) else None,
+            'Avg O2': np.nanmean(manager.samples[athlete].view('oxygen')) if len(manager.samples[athlete]) else None,
+            'Rejected': sum(manager.detectors[athlete].rejected.values()) if athlete in manager.detectors else 0
+        } for athlete in athletes])
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        for athlete, error in manager.errors.items():
+            st.warning(f"{athlete}: {error}")
+
 # BMI Calculator Page
 elif nav == '⚖️ BMI Calculator':
     st.header("⚖️ BMI Calculator & Sport Recommendation")
@@ -908,9 +1106,10 @@ elif nav == '⚖️ BMI Calculator':
         
         # Add stress data if available
         if 'biometrics' in st.session_state:
-            avg_gsr = np.mean(st.session_state.biometrics['gsr']) if st.session_state.biometrics['gsr'] else None
-            avg_pulse = np.mean(st.session_state.biometrics['pulse']) if st.session_state.biometrics['pulse'] else None
-            avg_oxygen = np.mean(st.session_state.biometrics['oxygen']) if st.session_state.biometrics['oxygen'] else None
+            samples = st.session_state.biometrics['samples']
+            avg_gsr = np.nanmean(samples.view('gsr')) if len(samples) else None
+            avg_pulse = np.nanmean(samples.view('pulse')) if len(samples) else None
+            avg_oxygen = np.nanmean(samples.view('oxygen')) if len(samples) else None
             
             st.session_state.bmi_data['avg_gsr'] = avg_gsr
             st.session_state.bmi_data['avg_pulse'] = avg_pulse
@@ -0,0 +1,128 @@
+import numpy as np
+
+from frame_assembler import CHANNELS
+
+
+# Contact and motion-artifact checks for the monitoring pipeline.
+# Every reading of a batch of frames gets a bitmask of quality flags from:
+#   the device's own reports ("Place fingers...", "GSR=NF"),
+#   the plausible range of the channel,
+#   derivative spikes: a jump from the previous reading that no body produces
+#   between two samples (fingers moving on the electrodes or in the clip),
+#   flat-lines: the same reading too many times in a row (sensor stuck or
+#   disconnected).
+# The checks are array operations over the whole batch; the previous reading
+# and the length of its run are carried between batches, so the flags do not
+# depend on how the stream is chunked. clean() replaces flagged readings with
+# NaN, which the statistics, the chart, the store and the exports all skip.
+
+# Quality flags, combined bitwise per reading
+NO_CONTACT = 1      # "Place fingers...": GSR at or below the sketch's contact threshold
+NOT_FITTED = 2      # "GSR=NF": GSR at the top of the range, electrodes open or shorted
+OUT_OF_RANGE = 4    # outside RANGES
+SPIKE = 8           # jump from the previous reading larger than MAX_STEP: motion
+FLAT = 16           # same reading FLAT_RUN times in a row
+
+FLAG_NAMES = {NO_CONTACT: 'no contact', NOT_FITTED: 'sensor not fitted', OUT_OF_RANGE: 'out of range',
+              SPIKE: 'motion spike', FLAT: 'flat-line'}
+
+# Plausible readings per channel, inclusive. The GSR limits are the sketch's
+# own: it prints "Place fingers..." at <= 10 uS and "GSR=NF" at >= 600 uS.
+RANGES = {'gsr': (11, 599), 'pulse': (30, 220), 'oxygen': (70, 100)}
+# Flags for readings below / above the range
+RANGE_FLAGS = {'gsr': (NO_CONTACT, NOT_FITTED)}
+# Largest believable change between consecutive readings
+MAX_STEP = {'gsr': 150, 'pulse': 40, 'oxygen': 6}
+# Oxygen is a whole percentage that can legitimately hold for minutes, so it
+# has no flat-line check
+FLAT_RUN = {'gsr': 10, 'pulse': 20}
+
+# Device reports (FrameAssembler 'report' column): flag and channels affected.
+# "Place fingers..." replaces the whole cycle; "GSR=NF" only the GSR reading.
+REPORTS = {'contact': (NO_CONTACT, CHANNELS), 'nf': (NOT_FITTED, ('gsr',))}
+
+
+def describe_flags(flags):
+    flags = int(flags)
+    return ', '.join(name for bit, name in FLAG_NAMES.items() if flags & bit) or 'ok'
+
+
+def channel_flags(values, limits, range_flags=(OUT_OF_RANGE, OUT_OF_RANGE), max_step=None, flat_run=None,
+                  last=None, run=0):
+    """Quality flags for one channel's readings.
+
+    last/run are the previous in-range reading and the length of its run,
+    as returned by the previous call; returns (flags, last, run). Missing
+    (NaN) readings get no flags and do not break a run. Spikes and runs are
+    measured between in-range readings only, so both edges of a short jump
+    are flagged.
+    """
+    values = np.asarray(values, dtype=float)
+    flags = np.zeros(len(values), dtype=np.uint8)
+    flags[values < limits[0]] |= range_flags[0]
+    flags[values > limits[1]] |= range_flags[1]
+
+    checked = np.flatnonzero((flags == 0) & ~np.isnan(values))
+    v = values[checked]
+    if not len(v):
+        return flags, last, run
+
+    previous = np.concatenate(([v[0] if last is None else last], v[:-1]))
+    if max_step is not None:
+        flags[checked[np.abs(v - previous) > max_step]] |= SPIKE
+
+    # Run length at every reading: distance back to the last change, plus the
+    # carried run when the batch continues it
+    same = v == previous
+    if last is None:
+        same[0] = False
+    idx = np.arange(len(v))
+    start = np.maximum.accumulate(np.where(same, -1, idx))
+    runs = np.where(start >= 0, idx - start + 1, run + idx + 1)
+    if flat_run is not None:
+        flags[checked[runs >= flat_run]] |= FLAT
+    return flags, float(v[-1]), int(runs[-1])
+
+
+class ArtifactDetector:
+    """Per-channel quality flags for the frames of one device.
+
+    update() takes FrameAssembler.pop_frames() columns and returns
+    {channel: uint8 flags} with one entry per frame; 0 is a usable reading.
+    """
+
+    def __init__(self, channels=CHANNELS):
+        self.channels = channels
+        self._state = {name: (None, 0) for name in channels}
+        # Flags of the newest frame and count of flagged readings, per channel
+        self.latest = dict.fromkeys(channels, 0)
+        self.rejected = dict.fromkeys(channels, 0)
+
+    def update(self, frames):
+        n = len(frames['time'])
+        report = np.asarray(frames.get('report', [''] * n), dtype=object)
+        quality = {}
+        for name in self.channels:
+            flags, *self._state[name] = channel_flags(
+                frames[name], RANGES[name], RANGE_FLAGS.get(name, (OUT_OF_RANGE, OUT_OF_RANGE)),
+                MAX_STEP.get(name), FLAT_RUN.get(name), *self._state[name])
+            for kind, (flag, channels) in REPORTS.items():
+                if name in channels:
+                    flags[report == kind] |= flag
+            quality[name] = flags
+            if n:
+                self.latest[name] = int(flags[-1])
+                self.rejected[name] += int(np.count_nonzero(flags))
+        return quality
+
+
+def clean(frames, quality):
+    # Copy of the frames with flagged readings set to NaN, plus a 'quality'
+    # column holding every channel's flags of the frame combined
+    out = dict(frames)
+    combined = np.zeros(len(frames['time']), dtype=np.uint8)
+    for name, flags in quality.items():
+        out[name] = np.where(flags == 0, frames[name], np.nan)
+        combined |= flags
+    out['quality'] = combined
+    return out
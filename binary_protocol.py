@@ -0,0 +1,208 @@
+import struct
+
+import numpy as np
+
+
+# Compact binary frames sent by GSR_Temp_Pulse_Oximeter.ino when it is built
+# with BINARY_FRAMES 1. Each frame is 15 bytes, little-endian:
+#   A5 5A | seq u16 | gsr u16 | ir u32 | red u32 | crc8
+# The CRC (poly 0x07, init 0) covers seq..red. The sequence number wraps at
+# 65536 and lets the decoder count frames lost on the wire.
+SYNC = b'\xa5\x5a'
+# Frames per second; the sketch paces them FRAME_INTERVAL_MS = 10 apart
+SAMPLE_RATE = 100
+FRAME_DTYPE = np.dtype([
+    ('sync', 'u1', 2),
+    ('seq', '<u2'),
+    ('gsr', '<u2'),
+    ('ir', '<u4'),
+    ('red', '<u4'),
+    ('crc', 'u1'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+_PAYLOAD = slice(2, FRAME_SIZE - 1)
+_STRUCT = struct.Struct('<2sHHII')
+
+
+def _crc8_table(poly=0x07):
+    table = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly if crc & 0x80 else crc << 1) & 0xFF
+        table[i] = crc
+    return table
+
+
+_CRC8 = _crc8_table()
+
+
+def crc8(data):
+    crc = 0
+    for byte in bytes(data):
+        crc = int(_CRC8[crc ^ byte])
+    return crc
+
+
+def encode_frame(seq, gsr, ir, red):
+    body = _STRUCT.pack(SYNC, seq & 0xFFFF, gsr, ir, red)
+    return body + bytes([crc8(body[_PAYLOAD])])
+
+
+class FrameDecoder:
+    """Decodes binary frames from raw serial bytes in bulk.
+
+    feed() takes whatever bytes have arrived and returns the complete, valid
+    frames as a structured array (FRAME_DTYPE). Partial frames are kept for
+    the next call; frames that fail the CRC are counted and skipped.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.dropped = 0
+        self.last_seq = None
+
+    def read(self, ser):
+        # Everything the port has buffered, without blocking for a full frame
+        return self.feed(ser.read(ser.in_waiting or 1))
+
+    def feed(self, data):
+        self.buffer += data
+        buf = np.frombuffer(bytes(self.buffer), dtype=np.uint8)
+        n = len(buf)
+
+        # Candidate frame starts: sync pair with a whole frame after it
+        starts = np.flatnonzero((buf[:-1] == SYNC[0]) & (buf[1:] == SYNC[1]))
+        incomplete = starts[starts + FRAME_SIZE > n]
+        starts = starts[starts + FRAME_SIZE <= n]
+        rows = buf[starts[:, None] + np.arange(FRAME_SIZE)]
+
+        crc = np.zeros(len(rows), dtype=np.uint8)
+        for j in range(_PAYLOAD.start, _PAYLOAD.stop):
+            crc = _CRC8[crc ^ rows[:, j]]
+        valid = crc == rows[:, -1]
+
+        good = starts[valid]
+        if len(good) > 1 and (np.diff(good) < FRAME_SIZE).any():
+            # A stray sync pair (line noise, or inside a payload) also passed
+            # the CRC; of two overlapping frames keep the one whose sequence
+            # number is fewer steps ahead of the previous frame's, or the
+            # earliest when there is no previous frame
+            seq = rows[valid][:, 2].astype(np.int64) | rows[valid][:, 3].astype(np.int64) << 8
+            keep, end, before = [], -1, self.last_seq
+            for i, start in enumerate(good):
+                if start >= end:
+                    if keep:
+                        before = int(seq[keep[-1]])
+                    keep.append(i)
+                elif before is not None and (seq[i] - before - 1) % 65536 < (seq[keep[-1]] - before - 1) % 65536:
+                    keep[-1] = i
+                else:
+                    continue
+                end = start + FRAME_SIZE
+            good = good[keep]
+            valid_rows = rows[valid][keep]
+        else:
+            valid_rows = rows[valid]
+
+        # Keep anything that could still be the start of a frame. A frame
+        # overlapping a candidate that is not complete yet waits for the next
+        # call, so the choice between them does not depend on the chunking.
+        cut = max(good[-1] + FRAME_SIZE if len(good) else 0, n - FRAME_SIZE + 1, 0)
+        if len(good) and len(incomplete):
+            waiting = good + FRAME_SIZE > incomplete[0]
+            if waiting.any():
+                cut = int(good[waiting][0])
+                good, valid_rows = good[~waiting], valid_rows[~waiting]
+
+        # Failed candidates that do not sit inside an accepted frame; those
+        # after the cut are looked at again next time
+        bad = starts[~valid]
+        bad = bad[bad < cut]
+        if len(bad) and not len(good):
+            self.crc_errors += len(bad)
+        elif len(bad):
+            inside = np.searchsorted(good, bad, side='right') - 1
+            covered = (inside >= 0) & (bad < good[np.maximum(inside, 0)] + FRAME_SIZE)
+            self.crc_errors += int((~covered).sum())
+        del self.buffer[:cut]
+
+        frames = np.ascontiguousarray(valid_rows).view(FRAME_DTYPE).ravel()
+        self._track_sequence(frames['seq'])
+        self.frames += len(frames)
+        return frames
+
+    def _track_sequence(self, seq):
+        if not len(seq):
+            return
+        seq = seq.astype(np.int64)
+        if self.last_seq is not None:
+            seq = np.concatenate(([self.last_seq], seq))
+        gaps = (np.diff(seq) - 1) % 65536
+        # A gap this large is a repeated or reordered frame, not a loss
+        self.dropped += int(gaps[gaps < 32768].sum())
+        self.last_seq = int(seq[-1])
+
+
+if __name__ == '__main__':
+    # Microbenchmark: python binary_protocol.py
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 200_000
+    stream = bytearray(b''.join(
+        encode_frame(i, int(g), int(ir), int(red))
+        for i, (g, ir, red) in enumerate(zip(rng.integers(0, 600, n),
+                                             rng.integers(0, 1 << 18, n),
+                                             rng.integers(0, 1 << 18, n)))
+        if i % 1000 != 999  # lose one frame in a thousand
+    ))
+    stream[FRAME_SIZE * 10 + 6] ^= 0xFF  # corrupt one payload byte
+
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    for i in range(0, len(stream), 4096):
+        decoder.feed(stream[i:i + 4096])
+    elapsed = time.perf_counter() - start
+    print(f"{decoder.frames:,} frames in {elapsed:.3f}s "
+          f"({decoder.frames / elapsed:,.0f} frames/sec, {len(stream) / elapsed / 1e6:.1f} MB/sec)")
+    print(f"crc errors: {decoder.crc_errors}, dropped by sequence: {decoder.dropped}")
+    text = len(b'GSR=123 uS    \r\nModerate stress    \r\nPulse:87\r\nO2:97%\r\n\r\n')
+    print(f"bytes per sample: binary {FRAME_SIZE}, text {text}")
+
+    # Fuzz check: frames separated by garbage and stray sync pairs, fed in
+    # random chunk sizes, must decode exactly as in a single call, without an
+    # exception, and every intact frame must come out. (A stray sync pair
+    # followed by junk passes CRC-8 one time in 256, so a few extra frames
+    # are expected. Each stream opens with a clean frame: overlaps are
+    # resolved by sequence number, which needs a previous frame.)
+    for trial in range(200):
+        parts, expected = [encode_frame(0, 0, 0, 0)], [0]
+        for seq in range(1, int(rng.integers(2, 60))):
+            junk = rng.integers(0, 256, int(rng.integers(0, 20)), dtype=np.uint8)
+            junk[junk == SYNC[0]] = 0
+            parts.append(junk.tobytes())
+            if rng.random() < 0.3:
+                parts.append(SYNC + rng.integers(0, 256, int(rng.integers(0, FRAME_SIZE)), dtype=np.uint8)
+                             .tobytes().replace(SYNC[:1], b'\x00'))
+            if rng.random() < 0.2:
+                # Corrupted frame
+                bad = bytearray(encode_frame(seq, 1, 2, 3))
+                bad[int(rng.integers(2, FRAME_SIZE))] ^= 0x01
+                parts.append(bytes(bad))
+            else:
+                parts.append(encode_frame(seq, seq, seq * 7, seq * 11))
+                expected.append(seq)
+        stream = b''.join(parts)
+        decoder, got, i = FrameDecoder(), [], 0
+        while i < len(stream):
+            size = int(rng.integers(1, 40))
+            got.extend(decoder.feed(stream[i:i + size])['seq'].tolist())
+            i += size
+        whole = FrameDecoder()
+        assert got == whole.feed(stream)['seq'].tolist(), trial
+        assert decoder.crc_errors == whole.crc_errors, trial
+        assert set(expected) <= set(got), (trial, got, expected)
+    print("fuzz check: ok")
@@ -0,0 +1,82 @@
+import serial
+
+from artifacts import ArtifactDetector, clean
+from frame_assembler import CHANNELS, FrameAssembler
+from ring_buffer import RingBuffer
+from serial_reader import SerialReader
+
+
+# Monitors a whole squad: one serial port per athlete.
+# Every port gets its own SerialReader thread (they spend their time blocked
+# in the driver, so 20+ of them stay cheap); poll() is the only place that
+# touches the parsed data, so the per-athlete buffers need no locking.
+class DeviceManager:
+    def __init__(self, devices, baud=9600, bulk=False, capacity=20_000):
+        # devices: {port: athlete_id}; ids key the buffers, so they must be unique
+        self.devices = dict(devices)
+        athletes = list(self.devices.values())
+        repeated = sorted({a for a in athletes if athletes.count(a) > 1})
+        if repeated:
+            raise ValueError(f"athlete assigned to more than one port: {', '.join(map(str, repeated))}")
+        self.baud = baud
+        self.bulk = bulk
+        self.readers = {}
+        self.assemblers = {}
+        self.detectors = {}
+        self.errors = {}
+        self.stopped = False
+        self.samples = {athlete: RingBuffer(capacity=capacity) for athlete in self.devices.values()}
+
+    def start(self):
+        for port, athlete in self.devices.items():
+            try:
+                ser = serial.Serial(port, self.baud, timeout=1)
+            except serial.SerialException as e:
+                self.errors[athlete] = e
+                continue
+            self.readers[athlete] = SerialReader(ser, bulk=self.bulk).start()
+            self.assemblers[athlete] = FrameAssembler()
+            self.detectors[athlete] = ArtifactDetector()
+        return self
+
+    def poll(self, t0=0.0):
+        # Move everything the readers have queued into the per-athlete buffers;
+        # returns the number of new frames
+        new = 0
+        for athlete, reader in self.readers.items():
+            if reader.error and athlete not in self.errors:
+                self.errors[athlete] = reader.error
+            assembler = self.assemblers[athlete]
+            for t, line in reader.drain_timed():
+                assembler.feed(t, line)
+            # Readings failing the artifact checks are kept out of the buffers
+            frames = assembler.pop_frames()
+            frames = clean(frames, self.detectors[athlete].update(frames))
+            if len(frames['time']):
+                self.samples[athlete].extend(frames['time'] - t0,
+                                             **{name: frames[name] for name in CHANNELS})
+                new += len(frames['time'])
+        return new
+
+    def latest(self, athlete):
+        assembler = self.assemblers.get(athlete)
+        return assembler.latest if assembler else dict.fromkeys(CHANNELS)
+
+    def status(self, athlete):
+        if athlete in self.errors:
+            return 'error'
+        reader = self.readers.get(athlete)
+        if reader is None:
+            return 'not connected'
+        if reader.is_alive():
+            return 'live'
+        return 'completed' if self.stopped else 'stopped'
+
+    def stop(self):
+        # Readers are kept so status() still reports how each device ended
+        if self.stopped:
+            return
+        self.stopped = True
+        for reader in self.readers.values():
+            reader.stop()
+            reader.ser.close()
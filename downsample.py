@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+# Visual-fidelity downsampling for long biometric series.
+# Both methods return the indices of the points to keep, so the same selection
+# can be applied to the time axis and the values.
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: keeps the point in each bucket that
+    spans the largest triangle with its neighbours, which preserves peaks."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x = x[hi:edges[i + 2]].mean()
+            avg_y = y[hi:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(y, n_out):
+    """Min/max bucketing: keeps the lowest and highest sample of each bucket.
+    Fully vectorized, slightly less faithful than LTTB on smooth curves."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    n_buckets = n_out // 2
+    size = n // n_buckets
+    # The last bucket also takes the n % n_buckets leftover (newest) samples
+    last = (n_buckets - 1) * size
+    body = y[:last].reshape(n_buckets - 1, size)
+    offsets = np.arange(n_buckets - 1) * size
+    keep = np.concatenate([
+        offsets + body.argmin(axis=1),
+        offsets + body.argmax(axis=1),
+        [last + y[last:].argmin(), last + y[last:].argmax()],
+        [0, n - 1]
+    ])
+    return np.unique(keep)
+
+
+def chart_frame(time, series, max_points=1000, method='lttb'):
+    """Long-format DataFrame (Time, Value, Metric) for px.line with every
+    trace capped at max_points. Missing (NaN) readings are left out."""
+    time = np.asarray(time, dtype=float)
+    frames = []
+    for name, values in series.items():
+        values = np.asarray(values, dtype=float)
+        n = min(len(time), len(values))
+        t, v = time[:n], values[:n]
+        # argmin/argmax and the triangle areas all pick NaN, so drop it first
+        ok = ~(np.isnan(t) | np.isnan(v))
+        t, v = t[ok], v[ok]
+        idx = lttb(t, v, max_points) if method == 'lttb' else minmax(v, max_points)
+        frames.append(pd.DataFrame({'Time': t[idx], 'Value': v[idx], 'Metric': name}))
+    return pd.concat(frames, ignore_index=True)
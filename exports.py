@@ -0,0 +1,82 @@
+import tempfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+
+# Download formats for the monitoring exports: name -> (file extension, MIME type).
+# Parquet and Arrow keep one copy of each distinct value per column (dictionary
+# encoding), so per-session constants and repeated device lines cost almost nothing.
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def constant(value, n):
+    # A column holding the same value n times, stored as one category
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [value])
+
+
+def export(df, fmt='CSV', categorical=()):
+    """Serialize df for st.download_button; returns (data, extension, mime)."""
+    extension, mime = EXPORT_FORMATS[fmt]
+    if fmt == 'CSV':
+        return df.to_csv(index=False), extension, mime
+
+    df = df.astype({name: 'category' for name in categorical})
+    buf = BytesIO()
+    if fmt == 'Parquet':
+        df.to_parquet(buf, index=False, compression='zstd')
+    else:
+        df.reset_index(drop=True).to_feather(buf, compression='zstd')
+    return buf.getvalue(), extension, mime
+
+
+def frame_chunks(columns, chunk_size=50_000):
+    # DataFrames over consecutive slices of a dict of equal-length arrays
+    n = len(next(iter(columns.values()))) if columns else 0
+    for start in range(0, n, chunk_size):
+        yield pd.DataFrame({name: values[start:start + chunk_size] for name, values in columns.items()})
+
+
+def export_chunks(chunks, fmt='CSV'):
+    """Write DataFrame chunks straight to a temporary file.
+
+    Only one chunk is in memory at a time. Returns (file, extension, mime);
+    the file is unbuffered and rewound, ready for st.download_button, and is
+    deleted once closed. Every chunk must have the same columns and dtypes.
+    With no chunks at all the file is still valid, with no rows or columns;
+    pass an empty chunk to keep the header/schema.
+    """
+    extension, mime = EXPORT_FORMATS[fmt]
+    out = tempfile.TemporaryFile(buffering=0)
+    writer = None
+    for i, chunk in enumerate(chunks):
+        if fmt == 'CSV':
+            out.write(chunk.to_csv(index=False, header=i == 0).encode())
+            continue
+        import pyarrow as pa
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            if fmt == 'Parquet':
+                import pyarrow.parquet as pq
+                writer = pq.ParquetWriter(out, table.schema, compression='zstd')
+            else:
+                writer = pa.ipc.new_file(out, table.schema,
+                                         options=pa.ipc.IpcWriteOptions(compression='zstd'))
+        writer.write_table(table)
+    if writer is None and fmt != 'CSV':
+        # A zero-byte file is not valid Parquet/Arrow
+        import pyarrow as pa
+        if fmt == 'Parquet':
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(out, pa.schema([]), compression='zstd')
+        else:
+            writer = pa.ipc.new_file(out, pa.schema([]))
+    if writer is not None:
+        writer.close()
+    out.seek(0)
+    return out, extension, mime
@@ -2,13 +2,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
-import serial
-import serial.tools.list_ports
 from datetime import datetime
-import plotly.express as px
-import qrcode
 from io import BytesIO
 import base64
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from downsample import chart_frame
+from ring_buffer import RingBuffer
+from exports import export_chunks, frame_chunks
+from line_protocol import LineParser
 
 # Configure page
 st.set_page_config(
@@ -65,7 +68,11 @@ st.markdown("""
 st.title("Health Biometric Monitoring")
 
 # Function to generate QR code
+# Cached: reruns with unchanged text reuse the encoded image
+@st.cache_data
 def generate_qr_code(data):
+    import qrcode
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -224,17 +231,17 @@ Scan to download full data"""
         
         # Download all users data
         st.markdown("### Download All Users Data")
-        all_users_df = pd.DataFrame(st.session_state.bmi_users)
-        all_csv_data = all_users_df.to_csv(index=False)
-        
         col1, col2 = st.columns(2)
         with col1:
-            st.download_button(
-                label="💾 Download All Users Data",
-                data=all_csv_data,
-                file_name="all_users_bmi_data.csv",
-                mime="text/csv"
-            )
+            # Serialized only when asked for, not on every rerun
+            if st.button("📦 Prepare All Users Data"):
+                all_csv_data, _, _ = export_chunks([pd.DataFrame(st.session_state.bmi_users)])
+                st.download_button(
+                    label="💾 Download All Users Data",
+                    data=all_csv_data,
+                    file_name="all_users_bmi_data.csv",
+                    mime="text/csv"
+                )
         
         with col2:
             # Generate QR code that shows summary when scanned
@@ -264,6 +271,9 @@ Scan to download full data"""
 
 # Biometric Monitoring Page
 elif nav == '💓 Stress-O2-Pulse Monitoring':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
     st.header("🏥 Real-Time Biometric Monitoring")
     st.write("""
     Monitor physiological data in real-time:
@@ -278,12 +288,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
     if 'serial_conn' not in st.session_state:
         st.session_state.serial_conn = None
     if 'metrics' not in st.session_state:
-        st.session_state.metrics = {
-            'Time': [],
-            'GSR': [],
-            'Pulse': [],
-            'Oxygen': []
-        }
+        st.session_state.metrics = RingBuffer(capacity=100_000, channels=('GSR', 'Pulse', 'Oxygen'))
     if 'user_info' not in st.session_state:
         st.session_state.user_info = {
             'name': '',
@@ -318,6 +323,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         st.warning("No serial ports detected. Please connect your Arduino.")
     else:
         selected_port = st.selectbox("Select Arduino Port", available_ports)
+        max_chart_points = st.number_input("Max chart points per trace", min_value=100, max_value=5000, value=1000, step=100)
         
         # Create layout elements
         col1, col2, col3 = st.columns(3)
@@ -329,6 +335,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         chart_placeholder = st.empty()
         raw_data_expander = st.expander("View Raw Serial Data")
         raw_data_placeholder = raw_data_expander.empty()
+        malformed_placeholder = raw_data_expander.empty()
         
         # Start/Stop buttons
         col1, col2 = st.columns(2)
@@ -337,14 +344,10 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                 if st.button("▶ Start Real-Time Monitoring"):
                     try:
                         st.session_state.serial_conn = serial.Serial(selected_port, 9600, timeout=1)
+                        st.session_state.line_parser = LineParser()
                         st.session_state.monitoring_active = True
                         st.session_state.start_time = time.time()
-                        st.session_state.metrics = {
-                            'Time': [],
-                            'GSR': [],
-                            'Pulse': [],
-                            'Oxygen': []
-                        }
+                        st.session_state.metrics.clear()
                         st.success(f"🔗 Connected to {selected_port}")
                     except serial.SerialException as e:
                         st.error(f"❌ Connection Error: {str(e)}")
@@ -359,85 +362,77 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         if st.session_state.monitoring_active and st.session_state.serial_conn:
             try:
                 if st.session_state.serial_conn.in_waiting > 0:
-                    line = st.session_state.serial_conn.readline().decode('utf-8').strip()
-                    raw_data_placeholder.text(line)
+                    raw = st.session_state.serial_conn.readline()
+                    raw_data_placeholder.text(raw.decode('utf-8', errors='replace').strip())
                     
                     # Process GSR data
-                    if line.startswith("GSR="):
-                        try:
-                            gsr_value = int(line.split('=')[1].split()[0])
-                            st.session_state.metrics['GSR'].append(gsr_value)
-                            st.session_state.metrics['Time'].append(time.time() - st.session_state.start_time)
-                            
-                            # Update display
-                            gsr_placeholder.metric(
-                                "GSR (µS)", 
-                                f"{gsr_value}",
-                                help="Galvanic Skin Response - Higher values indicate more stress"
-                            )
-                            
-                            # Classify stress
-                            if gsr_value <= 100:
-                                status_placeholder.success("😊 Low Stress")
-                            elif gsr_value <= 200:
-                                status_placeholder.warning("😐 Moderate Stress")
-                            else:
-                                status_placeholder.error("😨 High Stress")
-                                
-                        except Exception as e:
-                            st.warning(f"GSR parsing error: {str(e)}")
+                    kind, value = st.session_state.line_parser.parse(raw)
+                    if st.session_state.line_parser.malformed:
+                        malformed_placeholder.caption(f"⚠️ {st.session_state.line_parser.malformed} malformed line(s) skipped")
+                    if kind == 'gsr':
+                        gsr_value = int(value)
+                        st.session_state.metrics.append(time.time() - st.session_state.start_time, GSR=gsr_value)
+                        
+                        # Update display
+                        gsr_placeholder.metric(
+                            "GSR (µS)", 
+                            f"{gsr_value}",
+                            help="Galvanic Skin Response - Higher values indicate more stress"
+                        )
+                        
+                        # Classify stress
+                        if gsr_value <= 100:
+                            status_placeholder.success("😊 Low Stress")
+                        elif gsr_value <= 200:
+                            status_placeholder.warning("😐 Moderate Stress")
+                        else:
+                            status_placeholder.error("😨 High Stress")
                     
                     # Process Pulse data
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse_value = int(line.split(':')[1])
-                            st.session_state.metrics['Pulse'].append(pulse_value)
-                            pulse_placeholder.metric(
-                                "Heart Rate", 
-                                f"{pulse_value} BPM",
-                                help="Beats per minute - Normal range: 60-100 BPM"
-                            )
-                        except:
-                            pass
+                    elif kind == 'pulse':
+                        pulse_value = int(value)
+                        st.session_state.metrics.update_last('Pulse', pulse_value)
+                        pulse_placeholder.metric(
+                            "Heart Rate", 
+                            f"{pulse_value} BPM",
+                            help="Beats per minute - Normal range: 60-100 BPM"
+                        )
                     
                     # Process O2 data
-                    elif line.startswith("O2:"):
-                        try:
-                            o2_value = float(line.split(':')[1].replace('%',''))
-                            st.session_state.metrics['Oxygen'].append(o2_value)
-                            o2_placeholder.metric(
-                                "SpO₂", 
-                                f"{o2_value}%",
-                                help="Blood oxygen saturation - Normal range: 95-100%"
-                            )
-                        except:
-                            pass
+                    elif kind == 'oxygen':
+                        o2_value = value
+                        st.session_state.metrics.update_last('Oxygen', o2_value)
+                        o2_placeholder.metric(
+                            "SpO₂", 
+                            f"{o2_value}%",
+                            help="Blood oxygen saturation - Normal range: 95-100%"
+                        )
                     
                     # Update chart periodically
-                    if len(st.session_state.metrics['Time']) > 1 and len(st.session_state.metrics['Time']) % 5 == 0:
-                        # Create DataFrame from the collected metrics
-                        df = pd.DataFrame({
-                            'Time': st.session_state.metrics['Time'],
-                            'GSR': st.session_state.metrics['GSR'],
-                            'Pulse': st.session_state.metrics['Pulse'][:len(st.session_state.metrics['Time'])],
-                            'Oxygen': st.session_state.metrics['Oxygen'][:len(st.session_state.metrics['Time'])]
-                        })
+                    if len(st.session_state.metrics) > 1 and len(st.session_state.metrics) % 5 == 0:
+                        # Downsample each trace to the point budget before plotting
+                        df = chart_frame(st.session_state.metrics.view('time'), {
+                            'GSR': st.session_state.metrics.view('GSR'),
+                            'Pulse': st.session_state.metrics.view('Pulse'),
+                            'Oxygen': st.session_state.metrics.view('Oxygen')
+                        }, max_points=max_chart_points)
                         
                         # Create interactive plot
                         fig = px.line(
                             df, 
                             x='Time', 
-                            y=['GSR', 'Pulse', 'Oxygen'],
+                            y='Value',
+                            color='Metric',
                             title='Real-Time Biometric Trends',
-                            labels={'value': 'Measurement', 'variable': 'Metric'},
+                            labels={'Value': 'Measurement'},
                             color_discrete_sequence=['blue', 'red', 'green']
                         )
                         
                         # Configure plot appearance
                         fig.update_layout(
                             yaxis_range=[0, max(
-                                max(st.session_state.metrics['GSR']) * 1.2 if st.session_state.metrics['GSR'] else 100,
-                                max(st.session_state.metrics['Pulse']) * 1.2 if st.session_state.metrics['Pulse'] else 100,
+                                np.nanmax(st.session_state.metrics.view('GSR'), initial=0) * 1.2,
+                                np.nanmax(st.session_state.metrics.view('Pulse'), initial=0) * 1.2,
                                 100  # Max for Oxygen
                             )],
                             legend=dict(
@@ -459,32 +454,36 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                     st.session_state.serial_conn.close()
         
         # Data download after stopping
-        if not st.session_state.monitoring_active and len(st.session_state.metrics['Time']) > 0:
-            # Create DataFrame with user info and metrics
-            df = pd.DataFrame(st.session_state.metrics)
-            df['User'] = st.session_state.user_info['name']
-            df['Session Start'] = st.session_state.user_info['session_start']
-            df['Session End'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            csv_data = df.to_csv(index=False)
-            filename = f"{st.session_state.user_info['name']}_biometric_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            
+        if not st.session_state.monitoring_active and len(st.session_state.metrics) > 0:
             col1, col2 = st.columns(2)
             with col1:
-                st.download_button(
-                    "📥 Download Biometric Data",
-                    csv_data,
-                    filename,
-                    "text/csv"
-                )
+                # Written chunk by chunk from the metric buffer, and only on request
+                if st.button("📦 Prepare Biometric Data"):
+                    session_end = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    chunks = (
+                        chunk.rename(columns={'time': 'Time'}).assign(**{
+                            'User': st.session_state.user_info['name'],
+                            'Session Start': st.session_state.user_info['session_start'],
+                            'Session End': session_end
+                        })
+                        for chunk in frame_chunks(st.session_state.metrics.frame())
+                    )
+                    csv_data, _, _ = export_chunks(chunks)
+                    filename = f"{st.session_state.user_info['name']}_biometric_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+                    st.download_button(
+                        "📥 Download Biometric Data",
+                        csv_data,
+                        filename,
+                        "text/csv"
+                    )
             
             with col2:
                 # Generate QR code that shows summary when scanned
                 qr_text = f"""Biometric Data for {st.session_state.user_info['name']}:
-Session Duration: {round(st.session_state.metrics['Time'][-1]/60, 1)} minutes
-Avg GSR: {round(np.mean(st.session_state.metrics['GSR']), 1)} µS
-Avg Pulse: {round(np.mean(st.session_state.metrics['Pulse']), 1)} BPM
-Avg SpO₂: {round(np.mean(st.session_state.metrics['Oxygen']), 1)}%
+Session Duration: {round(st.session_state.metrics.last('time')/60, 1)} minutes
+Avg GSR: {round(np.nanmean(st.session_state.metrics.view('GSR')), 1)} µS
+Avg Pulse: {round(np.nanmean(st.session_state.metrics.view('Pulse')), 1)} BPM
+Avg SpO₂: {round(np.nanmean(st.session_state.metrics.view('Oxygen')), 1)}%
 
 Scan to download full data"""
                 qr_img = generate_qr_code(qr_text)
@@ -498,9 +497,4 @@ Scan to download full data"""
             
             # Option to clear data
             if st.button("🧹 Clear Collected Data"):
-                st.session_state.metrics = {
-                    'Time': [],
-                    'GSR': [],
-                    'Pulse': [],
-                    'Oxygen': []
-                }
\ No newline at end of file
+                st.session_state.metrics.clear()
\ No newline at end of file
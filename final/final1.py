@@ -2,10 +2,12 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
-import serial
-import serial.tools.list_ports
 from datetime import datetime
-import plotly.express as px
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from downsample import chart_frame
+from line_protocol import LineParser
 
 # Configure page
 st.set_page_config(
@@ -208,6 +210,9 @@ elif nav == '⚖️ BMI Calculator':
         st.info("Please enter your information and click 'Calculate BMI' to see results")
 # Biometric Monitoring Page
 elif nav == '💓 Stress-O2-Pulse Monitoring':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
     st.header("🏥 Real-Time Biometric Monitoring")
     st.write("""
     Monitor data in real-time:
@@ -223,10 +228,12 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         st.warning("No serial ports detected. Please connect your Arduino.")
     else:
         selected_port = st.selectbox("Select Arduino Port", available_ports)
+        max_chart_points = st.number_input("Max chart points per trace", min_value=100, max_value=5000, value=1000, step=100)
         
         if st.button("▶ Start Real-Time Monitoring"):
             try:
                 ser = serial.Serial(selected_port, 9600, timeout=1)
+                parser = LineParser()
                 st.success(f"🔗 Connected to {selected_port}")
                 
                 # Create layout
@@ -238,6 +245,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                 status_placeholder = st.empty()
                 chart_placeholder = st.empty()
                 raw_data_expander = st.expander("View Raw Serial Data")
+                malformed_placeholder = st.empty()
                 
                 # Data storage
                 metrics = {
@@ -252,77 +260,70 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                 # Monitoring loop
                 while True:
                     if ser.in_waiting > 0:
-                        line = ser.readline().decode('utf-8').strip()
-                        raw_data_expander.write(line)
+                        raw = ser.readline()
+                        raw_data_expander.write(raw.decode('utf-8', errors='replace').strip())
                         
                         # Process GSR data
-                        if line.startswith("GSR="):
-                            try:
-                                gsr_value = int(line.split('=')[1].split()[0])
-                                metrics['GSR'].append(gsr_value)
-                                metrics['Time'].append(time.time() - start_time)
-                                
-                                # Update display
-                                gsr_placeholder.metric(
-                                    "GSR (µS)", 
-                                    f"{gsr_value}",
-                                    help="Galvanic Skin Response - Higher values indicate more stress"
-                                )
-                                
-                                # Classify stress
-                                if gsr_value <= 100:
-                                    status_placeholder.success("😊 Low Stress")
-                                elif gsr_value <= 200:
-                                    status_placeholder.warning("😐 Moderate Stress")
-                                else:
-                                    status_placeholder.error("😨 High Stress")
-                                    
-                            except Exception as e:
-                                st.warning(f"GSR parsing error: {str(e)}")
+                        kind, value = parser.parse(raw)
+                        if parser.malformed:
+                            malformed_placeholder.caption(f"⚠️ {parser.malformed} malformed line(s) skipped")
+                        if kind == 'gsr':
+                            gsr_value = int(value)
+                            metrics['GSR'].append(gsr_value)
+                            metrics['Time'].append(time.time() - start_time)
+                            
+                            # Update display
+                            gsr_placeholder.metric(
+                                "GSR (µS)", 
+                                f"{gsr_value}",
+                                help="Galvanic Skin Response - Higher values indicate more stress"
+                            )
+                            
+                            # Classify stress
+                            if gsr_value <= 100:
+                                status_placeholder.success("😊 Low Stress")
+                            elif gsr_value <= 200:
+                                status_placeholder.warning("😐 Moderate Stress")
+                            else:
+                                status_placeholder.error("😨 High Stress")
                         
                         # Process Pulse data
-                        elif line.startswith("Pulse:"):
-                            try:
-                                pulse_value = int(line.split(':')[1])
-                                metrics['Pulse'].append(pulse_value)
-                                pulse_placeholder.metric(
-                                    "Heart Rate", 
-                                    f"{pulse_value} BPM",
-                                    help="Beats per minute - Normal range: 60-100 BPM"
-                                )
-                            except:
-                                continue
+                        elif kind == 'pulse':
+                            pulse_value = int(value)
+                            metrics['Pulse'].append(pulse_value)
+                            pulse_placeholder.metric(
+                                "Heart Rate", 
+                                f"{pulse_value} BPM",
+                                help="Beats per minute - Normal range: 60-100 BPM"
+                            )
                         
                         # Process O2 data
-                        elif line.startswith("O2:"):
-                            try:
-                                o2_value = float(line.split(':')[1].replace('%',''))
-                                metrics['Oxygen'].append(o2_value)
-                                o2_placeholder.metric(
-                                    "SpO₂", 
-                                    f"{o2_value}%",
-                                    help="Blood oxygen saturation - Normal range: 95-100%"
-                                )
-                            except:
-                                continue
+                        elif kind == 'oxygen':
+                            o2_value = value
+                            metrics['Oxygen'].append(o2_value)
+                            o2_placeholder.metric(
+                                "SpO₂", 
+                                f"{o2_value}%",
+                                help="Blood oxygen saturation - Normal range: 95-100%"
+                            )
                         
                         # Update chart periodically
                         if len(metrics['Time']) % 5 == 0 and len(metrics['Time']) > 10:
-                            # Create DataFrame from the collected metrics
-                            df = pd.DataFrame({
-                                'Time': metrics['Time'],
+                            # Downsample each trace to the point budget before plotting
+                            df = chart_frame(metrics['Time'], {
                                 'GSR': metrics['GSR'],
-                                'Pulse': metrics['Pulse'][:len(metrics['Time'])],
-                                'Oxygen': metrics['Oxygen'][:len(metrics['Time'])]
-                            })
+                                'Pulse': metrics['Pulse'],
+                                'Oxygen': metrics['Oxygen']
+                            }, max_points=max_chart_points)
                             
                             # Create interactive plot
                             fig = px.line(
                                 df, 
                                 x='Time', 
-                                y=['GSR', 'Pulse', 'Oxygen'],
+                                y='Value',
+                                color='Metric',
                                 title='Real-Time Biometric Trends',
-                                labels={'value': 'Measurement', 'variable': 'Metric'},
+                                labels={'Value': 'Measurement'},
                                 color_discrete_sequence=['blue', 'red', 'green']
                             )
                             
@@ -0,0 +1,79 @@
+import numpy as np
+
+from line_protocol import LineParser
+
+
+CHANNELS = ('gsr', 'pulse', 'oxygen')
+
+
+# Groups the sketch's per-cycle output (GSR=, stress label, Pulse:, O2:, blank
+# line) into one frame per device cycle. Every reading keeps the timestamp of
+# the line it came from, so a dropped line leaves a gap in that frame instead
+# of shifting every later sample. The sketch's contact reports ("Place
+# fingers...", "GSR=NF") are kept in the frame's 'report' column.
+class FrameAssembler:
+    def __init__(self, parser=None):
+        self.parser = parser or LineParser()
+        self.latest = dict.fromkeys(CHANNELS)
+        self._open = None
+        self._done = []
+
+    def _close(self):
+        if self._open is not None:
+            self._done.append(self._open)
+            self._open = None
+
+    @property
+    def malformed(self):
+        return self.parser.malformed
+
+    def feed(self, t, line):
+        kind, value = self.parser.parse(line)
+        self.add(t, kind, value)
+
+    def add(self, t, kind, value):
+        if kind == 'end':
+            # Blank line ends the cycle
+            self._close()
+            return
+        if kind == 'label':
+            if self._open is not None:
+                self._open['label'] = value.decode() if isinstance(value, bytes) else value
+            return
+        if kind == 'contact':
+            # "Place fingers...": printed instead of the cycle's readings
+            if self._open is not None and 'report' in self._open:
+                self._close()
+            if self._open is None:
+                self._open = {'time': t, 'label': ''}
+            self._open['report'] = 'contact'
+            return
+        if kind == 'nf':
+            # GSR=NF: sensor not fitted, a GSR reading with no value
+            self.add(t, 'gsr', np.nan)
+            self._open['report'] = 'nf'
+            return
+        if kind not in CHANNELS:
+            return
+
+        # A GSR line always opens a new cycle; a repeated channel means the
+        # blank line (or the GSR line) of the previous cycle was lost
+        if self._open is not None and (kind == 'gsr' or kind in self._open):
+            self._close()
+        if self._open is None:
+            self._open = {'time': t, 'label': ''}
+        self._open[kind] = value
+        self._open['t_' + kind] = t
+        if not np.isnan(value):
+            self.latest[kind] = value
+
+    def pop_frames(self):
+        # Completed frames since the last call, as aligned columns
+        frames, self._done = self._done, []
+        out = {'time': np.array([f['time'] for f in frames], dtype=np.float64),
+               'label': [f['label'] for f in frames],
+               'report': [f.get('report', '') for f in frames]}
+        for name in CHANNELS:
+            out[name] = np.array([f.get(name, np.nan) for f in frames], dtype=np.float64)
+            out['t_' + name] = np.array([f.get('t_' + name, np.nan) for f in frames], dtype=np.float64)
+        return out
@@ -0,0 +1,136 @@
+from collections import deque
+
+import numpy as np
+from scipy import signal
+
+from live_stats import RollingWindow
+
+
+# Heart-rate variability from the beat-to-beat (RR) intervals of the pulse
+# pipeline (ppg.PulseExtractor). Time-domain metrics run over the last
+# `beats` intervals on rolling windows, so each new beat costs O(1) and memory
+# is bounded. Frequency-domain metrics (LF/HF) come from a Welch spectrum of
+# the evenly resampled RR series; they need a minute or more of beats and are
+# refreshed every few seconds rather than per beat.
+
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+
+def tachogram(times, rr, fs=4.0, start=None, stop=None):
+    # RR intervals (ms) resampled onto an even fs Hz grid by linear interpolation
+    times = np.asarray(times, dtype=float)
+    start = times[0] if start is None else start
+    stop = times[-1] if stop is None else stop
+    grid = np.arange(start, stop, 1.0 / fs)
+    return np.interp(grid, times, rr)
+
+
+def band_powers(tachograms, fs=4.0):
+    """LF power, HF power (ms^2) and LF/HF of evenly sampled RR series.
+
+    Works along the last axis: stack one row per device (same length) to get
+    every device's spectrum from one Welch call.
+    """
+    x = np.asarray(tachograms, dtype=float)
+    x = x - x.mean(axis=-1, keepdims=True)
+    freqs, psd = signal.welch(x, fs=fs, nperseg=min(256, x.shape[-1]), axis=-1)
+    df = freqs[1] - freqs[0]
+    lf_bins = (freqs >= LF_BAND[0]) & (freqs < LF_BAND[1])
+    hf_bins = (freqs >= HF_BAND[0]) & (freqs < HF_BAND[1])
+    lf = psd[..., lf_bins].sum(axis=-1) * df
+    hf = psd[..., hf_bins].sum(axis=-1) * df
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return lf, hf, lf / hf
+
+
+class HrvTracker:
+    """Streaming RMSSD, SDNN, pNN50 and LF/HF for one athlete.
+
+    add() takes beat times (s) and RR intervals (s) as returned by
+    PulseExtractor.update(). An interval differing by more than max_change
+    from the median of the last `reference` detected intervals (accepted or
+    not, so a lasting change of rhythm takes over within a few beats) is
+    treated as an ectopic or missed beat and left out. Successive
+    differences are only taken between two accepted intervals that share a
+    beat, so none spans a rejected or dropped interval.
+    """
+
+    def __init__(self, beats=120, spectrum_window=120.0, min_spectrum=60.0, resample_rate=4.0,
+                 refresh=5.0, max_change=0.2, reference=9):
+        self.rr = RollingWindow(beats)
+        self.recent = RollingWindow(reference)
+        self.sq_diff = RollingWindow(beats - 1)
+        self.nn50 = RollingWindow(beats - 1)
+        self.spectrum_window = spectrum_window
+        self.min_spectrum = min_spectrum
+        self.resample_rate = resample_rate
+        self.refresh = refresh
+        self.max_change = max_change
+        # (time, rr) pairs for the spectrum; bounded by the longest window at 200 bpm
+        self.history = deque(maxlen=int(spectrum_window * 200 / 60) + 1)
+        self.rejected = 0
+        # Last accepted interval and the time of the beat closing it
+        self._last_rr = None
+        self._last_time = None
+        self._spectrum = (np.nan, np.nan, np.nan)
+        self._spectrum_time = None
+
+    def add(self, times, rr):
+        times = np.asarray(times, dtype=float)
+        rr = np.asarray(rr, dtype=float) * 1000
+        if not len(rr):
+            return
+        # Beat by beat, so the reference follows a change of rhythm inside a batch
+        normal = np.ones(len(rr), dtype=bool)
+        for i, value in enumerate(rr.tolist()):
+            if len(self.recent) >= 5:
+                median = self.recent.median
+                normal[i] = abs(value - median) <= self.max_change * median
+            self.recent.extend([value])
+        self.rejected += int((~normal).sum())
+
+        # Successive differences between accepted intervals where the earlier
+        # one ends on the beat the later one starts from
+        last_rr = np.nan if self._last_rr is None else self._last_rr
+        last_time = np.nan if self._last_time is None else self._last_time
+        previous = np.concatenate(([last_rr], np.where(normal, rr, np.nan)[:-1]))
+        previous_end = np.concatenate(([last_time], np.where(normal, times, np.nan)[:-1]))
+        adjacent = np.abs(times - rr / 1000 - previous_end) < 0.01
+        pairs = normal & adjacent
+        diffs = rr[pairs] - previous[pairs]
+
+        self.rr.extend(rr[normal])
+        self.sq_diff.extend(diffs * diffs)
+        self.nn50.extend((np.abs(diffs) > 50).astype(float))
+        if normal[-1]:
+            self._last_rr, self._last_time = float(rr[-1]), float(times[-1])
+        else:
+            self._last_rr = self._last_time = None
+        self.history.extend(zip(times[normal].tolist(), rr[normal].tolist()))
+
+    def metrics(self):
+        # Time-domain metrics over the last `beats` intervals (ms, ms, %)
+        return {
+            'rmssd': float(np.sqrt(self.sq_diff.mean)) if len(self.sq_diff) else np.nan,
+            'sdnn': float(self.rr.std),
+            'pnn50': float(self.nn50.mean * 100) if len(self.nn50) else np.nan,
+        }
+
+    def spectrum(self, now=None):
+        # (LF, HF, LF/HF) over the last spectrum_window seconds, refreshed every `refresh` seconds
+        if not self.history:
+            return self._spectrum
+        now = self.history[-1][0] if now is None else now
+        if self._spectrum_time is not None and now - self._spectrum_time < self.refresh:
+            return self._spectrum
+        times, rr = np.array(self.history).T
+        recent = times >= now - self.spectrum_window
+        times, rr = times[recent], rr[recent]
+        if len(times) < 2 or times[-1] - times[0] < self.min_spectrum:
+            return self._spectrum
+        series = tachogram(times, rr, self.resample_rate)
+        lf, hf, ratio = band_powers(series, self.resample_rate)
+        self._spectrum = (float(lf), float(hf), float(ratio))
+        self._spectrum_time = now
+        return self._spectrum
@@ -0,0 +1,80 @@
+import argparse
+import os
+import subprocess
+import sys
+
+
+# Cold-start import cost per dashboard page, against a budget in milliseconds.
+# Heavy libraries are imported by the pages that use them, so each entry is
+# what a fresh Streamlit process imports to render that page. Keep the lists
+# in sync with the imports at the top of the scripts and inside their pages.
+#
+#   python import_budget.py             best of 3 runs per page, exit 1 if over
+#   python import_budget.py --runs 5
+
+DASHBOARD = ['streamlit', 'pandas', 'numpy', 'line_protocol']
+OLYMPIC = ['streamlit', 'pandas', 'numpy', 'line_protocol', 'olympic_data', 'model_registry', 'weight_predictor']
+MONITORING = ['serial', 'serial.tools.list_ports', 'plotly.express']
+
+PAGES = {
+    'charan.py: Home / Preprocessing': (OLYMPIC, 1500),
+    'charan.py: EDA / Trends / Prediction': (OLYMPIC + ['plotly.express'], 2000),
+    'charan.py: Monitoring': (OLYMPIC + MONITORING, 2000),
+    'app.py: Home / BMI': (DASHBOARD + ['serial_reader', 'ring_buffer', 'frame_assembler', 'live_stats',
+                                        'artifacts', 'session_store', 'exports'], 1200),
+    'app.py: Monitoring': (DASHBOARD + ['serial_reader', 'ring_buffer', 'frame_assembler', 'live_stats',
+                                        'artifacts', 'session_store', 'exports', 'live_chart'] + MONITORING, 1700),
+    'final/2.py: Home': (DASHBOARD + ['downsample', 'ring_buffer', 'exports'], 1200),
+    'final/2.py: BMI (QR codes)': (DASHBOARD + ['downsample', 'ring_buffer', 'exports', 'qrcode'], 1200),
+    'final/2.py: Monitoring': (DASHBOARD + ['downsample', 'ring_buffer', 'exports', 'qrcode'] + MONITORING, 1700),
+    'test/with_mobile.py: BMI + email': (DASHBOARD + ['qrcode', 'smtplib', 'email.mime.multipart',
+                                                       'email.mime.text', 'email.mime.base'], 1300),
+    'test/app[updated].py: Trends': (['streamlit', 'pandas', 'numpy', 'olympic_data', 'matplotlib.pyplot',
+                                      'plotly.express', 'seaborn'], 2500),
+}
+
+PROBE = """
+import importlib, time
+missing = []
+start = time.perf_counter()
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+print(time.perf_counter() - start)
+print(','.join(missing))
+"""
+
+
+def measure(modules, runs=3):
+    # Best of `runs` fresh interpreters; returns (seconds, modules not installed)
+    root = os.path.dirname(os.path.abspath(__file__))
+    best, missing = None, []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(modules=modules)], cwd=root,
+                             capture_output=True, text=True, check=True).stdout.splitlines()
+        seconds = float(out[0])
+        missing = [m for m in out[1].split(',') if m] if len(out) > 1 else []
+        best = seconds if best is None else min(best, seconds)
+    return best, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget per dashboard page")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    over = False
+    for page, (modules, budget_ms) in PAGES.items():
+        seconds, missing = measure(modules, args.runs)
+        ms = seconds * 1000
+        status = 'ok' if ms <= budget_ms else 'OVER'
+        over |= ms > budget_ms
+        note = f"  (not installed, not counted: {', '.join(missing)})" if missing else ''
+        print(f"{page:<40} {ms:7.0f} ms / {budget_ms:5d} ms  {status}{note}")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import re
+from collections import Counter
+
+
+# Parser for the text lines printed by GSR_Temp_Pulse_Oximeter.ino:
+#   GSR=123 uS      GSR=NF      Pulse:87      O2:97%
+#   Low Stress / Moderate stress / High stress      Place fingers...
+#   and a blank line at the end of every cycle.
+# parse() handles one line (bytes or str) with a single precompiled pattern;
+# parse_lines() a whole batch, e.g. everything one bulk read produced.
+# The sketch prints a small vocabulary of lines (a few hundred readings in
+# range), so results are memoized per line and most lines cost one dict lookup.
+_PATTERN = (
+    r'\s*(?:'
+    r'GSR=\s*(?:(?P<gsr>\d+)(?:\s|$)|(?P<nf>NF))'
+    r'|Pulse:\s*(?P<pulse>-?\d+(?:\.\d+)?)\s*$'
+    r'|O2:\s*(?P<oxygen>-?\d+(?:\.\d+)?)\s*%?\s*$'
+    r'|(?P<label>(?:Low|Moderate|High) [Ss]tress)'
+    r'|(?P<contact>Place fingers)'
+    r'|(?P<end>$)'
+    r')'
+)
+_TEXT = re.compile(_PATTERN)
+_BYTES = re.compile(_PATTERN.encode())
+_TEXT_PREFIXES = ('GSR', 'Pulse', 'O2')
+_BYTE_PREFIXES = tuple(p.encode() for p in _TEXT_PREFIXES)
+
+NUMERIC = ('gsr', 'pulse', 'oxygen')
+KINDS = NUMERIC + ('nf', 'label', 'contact', 'end', 'malformed', 'other')
+# Distinct lines remembered per parser before the memo starts over
+CACHE_SIZE = 4096
+
+
+class LineParser:
+    """Parses sensor lines into (kind, value) pairs.
+
+    kind is one of KINDS; value is a float for gsr/pulse/oxygen, the label
+    text for label lines and None otherwise. Lines that start like a reading
+    but do not parse are counted as malformed rather than dropped silently.
+    """
+
+    def __init__(self):
+        self.counts = dict.fromkeys(KINDS, 0)
+        self._seen = {}
+
+    @property
+    def malformed(self):
+        return self.counts['malformed']
+
+    def parse(self, line):
+        if isinstance(line, bytearray):
+            line = bytes(line)
+        result = self._seen.get(line) or self._match(line)
+        self.counts[result[0]] += 1
+        return result
+
+    def parse_lines(self, lines):
+        get, match = self._seen.get, self._match
+        out = []
+        append = out.append
+        for line in lines:
+            try:
+                result = get(line)
+            except TypeError:
+                # bytearray
+                line = bytes(line)
+                result = get(line)
+            append(result or match(line))
+        counts = self.counts
+        for kind, n in Counter(kind for kind, _ in out).items():
+            counts[kind] += n
+        return out
+
+    def _match(self, line):
+        # Uncounted parse of one line, remembered in _seen
+        if isinstance(line, bytes):
+            pattern, prefixes = _BYTES, _BYTE_PREFIXES
+        else:
+            pattern, prefixes = _TEXT, _TEXT_PREFIXES
+
+        m = pattern.match(line)
+        if m is None:
+            kind = 'malformed' if line.lstrip().startswith(prefixes) else 'other'
+            result = kind, None
+        else:
+            kind = m.lastgroup
+            if kind in NUMERIC:
+                result = kind, float(m.group(kind))
+            elif kind == 'label':
+                result = kind, m.group(kind)
+            else:
+                result = kind, None
+
+        if len(self._seen) >= CACHE_SIZE:
+            self._seen.clear()
+        self._seen[line] = result
+        return result
+
+
+if __name__ == '__main__':
+    # Microbenchmark: python line_protocol.py
+    import time
+
+    import random
+
+    # Sketch cycles with readings spread over their usual range
+    rng = random.Random(0)
+    lines = []
+    for _ in range(50_000):
+        lines += [b'GSR=%d uS    \r' % rng.randint(20, 400), b'Moderate stress    \r', b'Pulse:%d\r' % rng.randint(50, 120),
+                  b'O2:%d%%\r' % rng.randint(90, 100), b'\r', b'GSR=NF\r']
+
+    def legacy(lines):
+        # The split/try/except parsing previously copied into every dashboard
+        out = []
+        for raw in lines:
+            line = raw.decode('utf-8').strip()
+            if line.startswith("GSR="):
+                try:
+                    out.append(int(line.split('=')[1].split()[0]))
+                except:
+                    continue
+            elif line.startswith("Pulse:"):
+                try:
+                    out.append(int(line.split(':')[1]))
+                except:
+                    continue
+            elif line.startswith("O2:"):
+                try:
+                    out.append(float(line.split(':')[1].replace('%', '')))
+                except:
+                    continue
+        return out
+
+    def bench(name, fn):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<28} {len(lines) / best:>12,.0f} lines/sec")
+
+    bench("legacy split/strip", lambda: legacy(lines))
+    bench("LineParser.parse_lines", lambda: LineParser().parse_lines(lines))
+    distinct = [b'GSR=%d uS\r' % i for i in range(len(lines))]
+    bench("  every line distinct", lambda: LineParser().parse_lines(distinct))
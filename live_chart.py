@@ -0,0 +1,71 @@
+import time
+from collections import deque
+
+import numpy as np
+import plotly.graph_objects as go
+
+
+# Streaming line chart for the monitoring page.
+# The figure (traces, layout, baseline lines) is built once; each refresh only
+# swaps in the latest window of points, so the cost of an update does not grow
+# with the length of the session.
+class StreamingChart:
+    def __init__(self, channels, title='', refresh_interval=2.0, window=600):
+        self.refresh_interval = refresh_interval
+        self.points = {name: (deque(maxlen=window), deque(maxlen=window)) for name in channels}
+        self.y_max = 100
+        self.last_render = 0.0
+        self._dirty = False
+
+        self.fig = go.Figure()
+        for name, color in channels.items():
+            self.fig.add_trace(go.Scatter(x=[], y=[], mode='lines', name=name, line=dict(color=color)))
+        self.fig.update_layout(
+            title=title,
+            xaxis_title='Time',
+            yaxis_title='Measurement',
+            legend=dict(orientation="h", y=1.1),
+            hovermode="x unified"
+        )
+        self._traces = {trace.name: trace for trace in self.fig.data}
+
+    def add_baseline(self, y, color, text, **kwargs):
+        self.fig.add_hline(y=y, line_dash="dot", line_color=color, annotation_text=text, **kwargs)
+
+    def append(self, name, t, value):
+        xs, ys = self.points[name]
+        xs.append(t)
+        ys.append(value)
+        if value > self.y_max:
+            self.y_max = value
+        self._dirty = True
+
+    def extend(self, name, ts, values):
+        # Batch append; samples missing a reading (NaN) are skipped
+        ts = np.asarray(ts, dtype=float)
+        values = np.asarray(values, dtype=float)
+        keep = ~np.isnan(values)
+        if not keep.any():
+            return
+        xs, ys = self.points[name]
+        xs.extend(ts[keep].tolist())
+        ys.extend(values[keep].tolist())
+        self.y_max = max(self.y_max, values[keep].max())
+        self._dirty = True
+
+    def render(self, placeholder, force=False):
+        # Redraw at most once per refresh_interval, and only if new points arrived
+        now = time.time()
+        if not self._dirty or (not force and now - self.last_render < self.refresh_interval):
+            return False
+
+        with self.fig.batch_update():
+            for name, (xs, ys) in self.points.items():
+                self._traces[name].x = tuple(xs)
+                self._traces[name].y = tuple(ys)
+            self.fig.layout.yaxis.range = [0, self.y_max]
+
+        placeholder.plotly_chart(self.fig, use_container_width=True)
+        self.last_render = now
+        self._dirty = False
+        return True
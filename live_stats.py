@@ -0,0 +1,213 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from frame_assembler import CHANNELS
+
+
+# Incremental statistics for the monitoring loop.
+# Every structure takes a batch of new samples (one ingestion step) and updates
+# in O(1) per sample: running mean/variance merge the batch into the totals,
+# rolling windows add the new samples and subtract the ones they push out, and
+# the EWMA folds the batch in with one dot product. Nothing is recomputed over
+# the session or the window. NaN (missing reading) samples are skipped.
+
+# Smallest spread used for z-scores, in channel units, so a very steady
+# baseline does not turn sensor noise into alerts. For GSR it reproduces the
+# old fixed 50/150 uS stress bands when the baseline is flat.
+MIN_SCALE = {'gsr': 25.0, 'pulse': 2.0, 'oxygen': 1.0}
+
+# |z| limits for normal / elevated stress; anything above is high
+STRESS_Z = (2.0, 6.0)
+
+
+def _valid(values):
+    values = np.asarray(values, dtype=float).ravel()
+    return values[~np.isnan(values)]
+
+
+def robust_baseline(values):
+    """Median and MAD-based standard deviation of the baseline samples.
+
+    Unlike the mean, a few spikes while the fingers settle on the sensor
+    do not move it. Returns (nan, nan) when there are no readings.
+    """
+    values = _valid(values)
+    if not len(values):
+        return np.nan, np.nan
+    median = float(np.median(values))
+    return median, 1.4826 * float(np.median(np.abs(values - median)))
+
+
+class RunningStats:
+    # Session-wide count, mean and variance; each batch is merged in with
+    # Chan's parallel form of Welford's update
+    def __init__(self):
+        self.count = 0
+        self.mean = np.nan
+        self._m2 = 0.0
+
+    def update(self, values):
+        values = _valid(values)
+        k = len(values)
+        if not k:
+            return
+        batch_mean = values.mean()
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        if not self.count:
+            self.count, self.mean, self._m2 = k, float(batch_mean), batch_m2
+            return
+        n = self.count + k
+        delta = batch_mean - self.mean
+        self.mean += delta * k / n
+        self._m2 += batch_m2 + delta * delta * self.count * k / n
+        self.count = n
+
+    @property
+    def var(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+
+class RollingWindow:
+    # Last `size` samples: running sums for mean/variance (taken around the
+    # first sample seen, to keep them well conditioned) and a sorted copy for
+    # the median, both updated only by the samples entering and leaving
+    def __init__(self, size):
+        self.size = size
+        self.values = np.zeros(size)
+        self.count = 0
+        self._shift = None
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._sorted = []
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def extend(self, values):
+        values = _valid(values)[-self.size:]
+        k = len(values)
+        if not k:
+            return
+        if self._shift is None:
+            self._shift = values[0]
+        slots = self.count + np.arange(k)
+        pos = slots % self.size
+        evicted = self.values[pos][slots >= self.size]
+
+        shifted, gone = values - self._shift, evicted - self._shift
+        self._sum += shifted.sum() - gone.sum()
+        self._sumsq += (shifted * shifted).sum() - (gone * gone).sum()
+        for old in evicted.tolist():
+            del self._sorted[bisect_left(self._sorted, old)]
+        for new in values.tolist():
+            insort(self._sorted, new)
+
+        self.values[pos] = values
+        self.count += k
+
+    @property
+    def mean(self):
+        n = len(self)
+        return self._shift + self._sum / n if n else np.nan
+
+    @property
+    def var(self):
+        n = len(self)
+        if n < 2:
+            return np.nan
+        return max(self._sumsq - self._sum * self._sum / n, 0.0) / (n - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    @property
+    def median(self):
+        n = len(self._sorted)
+        if not n:
+            return np.nan
+        mid = n // 2
+        return self._sorted[mid] if n % 2 else (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+
+def ewma(last, values, alpha):
+    # EWMA after folding in a batch: the recurrence y = (1-a)*y + a*x unrolled
+    values = _valid(values)
+    if not len(values):
+        return last
+    if last is None:
+        last = values[0]
+    decay = (1 - alpha) ** np.arange(len(values) - 1, -1, -1)
+    return float((1 - alpha) ** len(values) * last + alpha * (decay @ values))
+
+
+class ChannelStats:
+    """Running, rolling and EWMA statistics for one channel, plus its baseline."""
+
+    def __init__(self, windows=(10, 60, 300), alpha=0.2, min_scale=1.0):
+        self.total = RunningStats()
+        self.windows = {size: RollingWindow(size) for size in windows}
+        self.alpha = alpha
+        self.ewma = None
+        self.min_scale = min_scale
+        self.baseline = np.nan
+        self.scale = np.nan
+        self._baseline_values = []
+
+    def add_baseline(self, values):
+        self._baseline_values.append(_valid(values))
+
+    def fix_baseline(self):
+        values = np.concatenate(self._baseline_values) if self._baseline_values else []
+        self.baseline, self.scale = robust_baseline(values)
+        self._baseline_values = []
+        return self.baseline
+
+    def update(self, values):
+        self.total.update(values)
+        for window in self.windows.values():
+            window.extend(values)
+        self.ewma = ewma(self.ewma, values, self.alpha)
+
+    def zscores(self, values):
+        # Deviation from the baseline in baseline standard deviations
+        scale = max(self.scale, self.min_scale) if not np.isnan(self.scale) else self.min_scale
+        return (np.asarray(values, dtype=float) - self.baseline) / scale
+
+    def zscore(self, window=None):
+        # z-score of the rolling mean over `window` (the shortest one by default)
+        window = self.windows[window or min(self.windows)]
+        return float(self.zscores(window.mean))
+
+
+class SessionStats:
+    # ChannelStats for every channel, fed with FrameAssembler.pop_frames() columns
+    def __init__(self, channels=CHANNELS, windows=(10, 60, 300), alpha=0.2):
+        self.channels = {name: ChannelStats(windows, alpha, MIN_SCALE.get(name, 1.0)) for name in channels}
+
+    def __getitem__(self, name):
+        return self.channels[name]
+
+    def add_baseline(self, frames):
+        for name, stats in self.channels.items():
+            stats.add_baseline(frames[name])
+
+    def fix_baseline(self):
+        return {name: stats.fix_baseline() for name, stats in self.channels.items()}
+
+    def update(self, frames):
+        for name, stats in self.channels.items():
+            stats.update(frames[name])
+
+
+def stress_level(z):
+    # 0 normal, 1 elevated, 2 high; NaN (no baseline or no readings) counts as normal
+    z = abs(z)
+    if not z >= STRESS_Z[0]:
+        return 0
+    return 1 if z < STRESS_Z[1] else 2
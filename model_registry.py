@@ -0,0 +1,45 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def fingerprint(*arrays):
+    # Content hash of the training data, for data that has no dataset version
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(str(a.dtype).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+# Fitted models keyed by name and dataset fingerprint.
+# A model is trained the first time its key is seen, written to cache_dir as
+# JSON (e.g. a weight_predictor.fit() dict) and served from memory afterwards,
+# so a rerun of the page does no fitting at all.
+class ModelRegistry:
+    def __init__(self, cache_dir=os.path.join('.cache', 'models')):
+        self.cache_dir = cache_dir
+        self._models = {}
+
+    def get(self, name, version, train):
+        # train() is only called on a miss and must return a JSON-serializable dict
+        key = f"{name}-{version}"
+        if key in self._models:
+            return self._models[key]
+
+        path = os.path.join(self.cache_dir, key + '.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                model = json.load(f)
+        else:
+            model = train()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(model, f)
+            os.replace(path + '.tmp', path)
+        self._models[key] = model
+        return model
+
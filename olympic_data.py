@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+# Column types for athlete_events.csv, declared instead of inferred.
+# Repeated labels are categories (one copy of each distinct string, integer
+# codes per row), so value_counts/groupby/plots run on small int arrays.
+# Age stays floating point because it has missing values that the
+# preprocessing page fills with the column mean.
+DTYPES = {
+    'ID': 'int32',
+    'Name': 'object',
+    'Sex': 'category',
+    'Age': 'float32',
+    'Height': 'float32',
+    'Weight': 'float32',
+    'Team': 'category',
+    'NOC': 'category',
+    'Games': 'category',
+    'Year': 'int16',
+    'Season': 'category',
+    'City': 'category',
+    'Sport': 'category',
+    'Event': 'category',
+    'Medal': 'category',
+}
+
+# Bump when DTYPES or the conversion changes, so old binary copies are rebuilt
+SCHEMA_VERSION = 3
+
+MEDAL_RANK = {'Gold': 1, 'Silver': 2, 'Bronze': 3}
+
+
+def medal_rank(medal):
+    # Medal column as 1/2/3 for Gold/Silver/Bronze and 0 for no medal,
+    # computed on the category codes rather than row by row
+    medal = medal.astype('category')
+    ranks = np.array([MEDAL_RANK.get(c, 0) for c in medal.cat.categories] + [0], dtype=np.int8)
+    return pd.Series(ranks[medal.cat.codes.to_numpy()], index=medal.index, name=medal.name)
+
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_paths(path, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, name + '.feather'), os.path.join(cache_dir, name + '.json')
+
+
+def _cached_copy_is_current(path, binary, manifest_path):
+    if not (os.path.exists(binary) and os.path.exists(manifest_path)):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('schema') != SCHEMA_VERSION:
+        return False
+    st = os.stat(path)
+    if manifest['mtime_ns'] == st.st_mtime_ns and manifest['size'] == st.st_size:
+        return True
+    # Touched (e.g. re-copied) but maybe unchanged: the content hash decides
+    if manifest['size'] == st.st_size and manifest['sha1'] == file_hash(path):
+        manifest['mtime_ns'] = st.st_mtime_ns
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        return True
+    return False
+
+
+def convert(path, binary, manifest_path):
+    data = pd.read_csv(path, dtype=DTYPES)
+    os.makedirs(os.path.dirname(binary) or '.', exist_ok=True)
+    # Uncompressed so the file can be memory-mapped on load
+    tmp = binary + '.tmp'
+    feather.write_feather(data, tmp, compression='uncompressed')
+    os.replace(tmp, binary)
+    st = os.stat(path)
+    with open(manifest_path, 'w') as f:
+        json.dump({'schema': SCHEMA_VERSION, 'mtime_ns': st.st_mtime_ns,
+                   'size': st.st_size, 'sha1': file_hash(path)}, f)
+    return data
+
+
+def load_athlete_events(path='athlete_events.csv', cache_dir='.cache'):
+    """Load athlete_events.csv through a Feather copy in cache_dir.
+
+    The first load (or the first after the CSV changes) parses the CSV and
+    writes the copy; later loads memory-map the copy instead of parsing.
+    Raises FileNotFoundError if the CSV is missing.
+    """
+    binary, manifest_path = _cache_paths(path, cache_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if not _cached_copy_is_current(path, binary, manifest_path):
+        return convert(path, binary, manifest_path)
+    with pa.memory_map(binary) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+# Medal count cubes: one table per dimension, indexed by its key, with
+# None/Gold/Silver/Bronze counts and Total (medals only), sorted by Total.
+# Built once per dataset version and kept next to the Feather copy, so
+# "most medals" rankings are a head() and per-key lookups a .loc.
+#
+# 'YearMedalTeam' holds medal counts per (Year, Medal, Team), indexed by
+# (Year, Medal) and sorted so each pair is one contiguous run, biggest
+# count first; top_teams() answers a year/medal query with one slice.
+CUBE_DIMENSIONS = ('Name', 'Team', 'NOC', 'Year', 'Sport', 'Sex')
+CUBE_COLUMNS = ['None', 'Gold', 'Silver', 'Bronze']
+
+
+def build_medal_cubes(data):
+    rank = medal_rank(data['Medal']).to_numpy().astype(np.intp)
+    cubes = {}
+    for dim in CUBE_DIMENSIONS:
+        if isinstance(data[dim].dtype, pd.CategoricalDtype):
+            codes, keys = data[dim].cat.codes.to_numpy(), data[dim].cat.categories
+        else:
+            codes, keys = pd.factorize(data[dim], sort=True)
+        codes = codes.astype(np.intp)
+        seen = codes >= 0
+        counts = np.bincount(codes[seen] * 4 + rank[seen], minlength=len(keys) * 4).reshape(len(keys), 4)
+        cube = pd.DataFrame(counts, index=pd.Index(keys, name=dim), columns=CUBE_COLUMNS)
+        cube['Total'] = counts[:, 1:].sum(axis=1)
+        cubes[dim] = cube.sort_values('Total', ascending=False, kind='stable')
+    cubes['YearMedalTeam'] = _year_medal_team(data, rank)
+    return cubes
+
+
+def _year_medal_team(data, rank):
+    won = rank > 0
+    years, year_keys = pd.factorize(data['Year'].to_numpy()[won])
+    teams, team_keys = pd.factorize(data['Team'].to_numpy()[won])
+    combined = (years * 4 + rank[won]) * len(team_keys) + teams
+    keys, counts = np.unique(combined, return_counts=True)
+    table = pd.DataFrame({
+        'Year': year_keys[keys // len(team_keys) // 4],
+        'Medal': np.array(CUBE_COLUMNS)[keys // len(team_keys) % 4],
+        'Team': team_keys[keys % len(team_keys)],
+        'Count': counts,
+    })
+    table = table.sort_values(['Year', 'Medal', 'Count'], ascending=[True, True, False], kind='stable')
+    return table.set_index(['Year', 'Medal'])
+
+
+def top_teams(cubes, year, medal='Gold', n=5):
+    # Teams with the most medals of one kind in one year, as a Team -> count Series
+    table = cubes['YearMedalTeam']
+    try:
+        loc = table.index.get_loc((year, medal))
+    except KeyError:
+        return pd.Series(dtype='int64', name='Count')
+    # A pair with a single team comes back as a position, not a slice
+    if isinstance(loc, (int, np.integer)):
+        loc = slice(loc, loc + 1)
+    rows = table.iloc[loc]
+    return pd.Series(rows['Count'].to_numpy()[:n], index=pd.Index(rows['Team'].to_numpy()[:n], name='Team'), name='Count')
+
+
+def dataset_version(path='athlete_events.csv', cache_dir='.cache'):
+    """SHA-1 of the CSV behind the current binary copy, for keying derived caches.
+
+    Only stats the file when the copy is current, so it is cheap per rerun.
+    """
+    binary, manifest_path = _cache_paths(path, cache_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    if not _cached_copy_is_current(path, binary, manifest_path):
+        load_athlete_events(path, cache_dir)
+    with open(manifest_path) as f:
+        return json.load(f)['sha1']
+
+
+def load_medal_cubes(path='athlete_events.csv', cache_dir='.cache'):
+    """Medal cubes for athlete_events.csv, rebuilt only when the dataset changes."""
+    binary, _ = _cache_paths(path, cache_dir)
+    version = dataset_version(path, cache_dir)
+
+    stem = os.path.splitext(binary)[0] + '.medals'
+    cube_manifest = stem + '.json'
+    if os.path.exists(cube_manifest):
+        with open(cube_manifest) as f:
+            built = json.load(f)
+        if built.get('schema') == SCHEMA_VERSION and built.get('sha1') == version:
+            return {name: feather.read_feather(f"{stem}.{name}.feather").set_index(index)
+                    for name, index in built['index'].items()}
+
+    cubes = build_medal_cubes(load_athlete_events(path, cache_dir))
+    for name, cube in cubes.items():
+        feather.write_feather(cube.reset_index(), f"{stem}.{name}.feather")
+    with open(cube_manifest, 'w') as f:
+        json.dump({'schema': SCHEMA_VERSION, 'sha1': version,
+                   'index': {name: list(cube.index.names) for name, cube in cubes.items()}}, f)
+    return cubes
+
+
+if __name__ == '__main__':
+    # Cold vs cached load: python olympic_data.py [path/to/athlete_events.csv]
+    import shutil
+    import sys
+    import tempfile
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'athlete_events.csv'
+    cache_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        plain = pd.read_csv(path)
+        print(f"pd.read_csv:        {time.perf_counter() - start:.3f}s")
+        start = time.perf_counter()
+        load_athlete_events(path, cache_dir)
+        print(f"first load (build): {time.perf_counter() - start:.3f}s")
+        start = time.perf_counter()
+        data = load_athlete_events(path, cache_dir)
+        print(f"cached load:        {time.perf_counter() - start:.3f}s")
+        print(f"{len(data):,} rows, {data.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory "
+              f"({plain.memory_usage(deep=True).sum() / 1e6:.1f} MB as parsed by read_csv)")
+
+        def timed(name, fn):
+            for frame, label in ((plain, 'read_csv'), (data, 'schema')):
+                start = time.perf_counter()
+                for _ in range(5):
+                    fn(frame)
+                print(f"{name:<28} {label:<9} {(time.perf_counter() - start) / 5 * 1000:7.1f} ms")
+
+        timed("Team value_counts", lambda d: d['Team'].value_counts())
+        timed("Height mean by Year", lambda d: d.groupby('Year')['Height'].mean())
+        timed("Weight by Sport", lambda d: d.groupby('Sport', observed=True)['Weight'].describe())
+        timed("medals by Team", lambda d: d[d['Medal'].notnull()]['Team'].value_counts())
+
+        start = time.perf_counter()
+        load_medal_cubes(path, cache_dir)
+        print(f"medal cubes (build):  {time.perf_counter() - start:.3f}s")
+        start = time.perf_counter()
+        cubes = load_medal_cubes(path, cache_dir)
+        print(f"medal cubes (cached): {time.perf_counter() - start:.3f}s")
+        start = time.perf_counter()
+        for _ in range(1000):
+            cubes['Team']['Total'].head(10)
+            cubes['Team'].at[cubes['Team'].index[0], 'Gold']
+        print(f"top-10 + lookup:      {(time.perf_counter() - start) / 1000 * 1e6:.0f} us")
+        start = time.perf_counter()
+        for year in range(1896, 2017, 4):
+            top_teams(cubes, year)
+        print(f"gold by year (index): {(time.perf_counter() - start) / 31 * 1000:.2f} ms")
+        start = time.perf_counter()
+        for year in range(1896, 2017, 4):
+            data[(data.Year == year) & (data.Medal == 'Gold')].Team.value_counts().head()
+        print(f"gold by year (scan):  {(time.perf_counter() - start) / 31 * 1000:.2f} ms")
+    finally:
+        shutil.rmtree(cache_dir)
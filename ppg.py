@@ -0,0 +1,394 @@
+from collections import deque
+
+import numpy as np
+from scipy import signal
+
+from binary_protocol import SAMPLE_RATE
+from frame_assembler import CHANNELS
+from hrv import HrvTracker
+
+
+# Heart rate and SpO2 from the raw MAX30102 IR/red samples of the binary
+# frames, instead of the sketch's irValue/1100 and redValue/680.
+# For the heart rate the IR intensity is band-pass filtered to the pulse band,
+# each pulse shows up as a peak of the inverted signal (more blood, more
+# absorption, less IR), and BPM is the median beat-to-beat interval over a
+# sliding window. Everything works on whole batches of samples with state
+# carried between calls, so a stream can be fed in any chunk sizes.
+
+class BandpassFilter:
+    # Butterworth band-pass as second-order sections, along the last axis (any
+    # leading axes are independent streams); the filter state carries over
+    # between batches, so chunked output equals filtering the whole stream
+    def __init__(self, fs=SAMPLE_RATE, low=0.5, high=4.0, order=2):
+        self.sos = signal.butter(order, [low, high], btype='bandpass', fs=fs, output='sos')
+        self.zi = None
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        if not x.shape[-1]:
+            return x
+        if self.zi is None:
+            # Start as if the first sample had always been there: no DC step transient
+            zi = signal.sosfilt_zi(self.sos)
+            self.zi = zi.reshape((len(zi),) + (1,) * (x.ndim - 1) + (2,)) * x[..., :1]
+        y, self.zi = signal.sosfilt(self.sos, x, axis=-1, zi=self.zi)
+        return y
+
+
+class PulseExtractor:
+    """Beat detection and BPM from a stream of raw IR samples at fs Hz.
+
+    update() returns the beats completed by the batch as (time of the beat
+    closing each interval, RR interval), both in seconds. A peak is only
+    confirmed once `distance` samples after it have arrived, so a beat is
+    reported at most ~0.3 s late and never twice.
+    """
+
+    def __init__(self, fs=SAMPLE_RATE, window=8.0, min_bpm=40, max_bpm=200):
+        self.fs = fs
+        self.window = window
+        self.min_rr = 60.0 / max_bpm
+        self.max_rr = 60.0 / min_bpm
+        self.filter = BandpassFilter(fs)
+        self.distance = max(int(fs * self.min_rr), 1)
+        # Filtered samples kept for context: peaks near a batch edge and the
+        # prominence threshold both look back about two seconds
+        self.context = max(2 * self.distance, int(2 * fs))
+        self.count = 0
+        self.beats = 0
+        self.last_peak = None
+        self._tail = np.empty(0)
+        self._final = 0
+        self.rr = deque(maxlen=int(window / self.min_rr) + 1)
+
+    def update(self, ir, gaps=()):
+        # gaps: (start, end) spans in seconds where samples were lost and
+        # filled in; an interval overlapping one is not a true beat interval
+        y = -self.filter(ir)
+        seg_start = self.count - len(self._tail)
+        seg = np.concatenate((self._tail, y))
+        self.count += len(y)
+        self._tail = seg[-self.context:]
+        if len(seg) < 3:
+            return np.empty(0), np.empty(0)
+
+        # Adaptive threshold: a beat stands out at least half as much as the
+        # strongest pulse in the last two seconds, which drops dicrotic notches
+        peaks, props = signal.find_peaks(seg, distance=self.distance, prominence=0.2 * seg.std())
+        if len(peaks):
+            peaks = peaks[props['prominences'] >= 0.5 * props['prominences'].max()]
+        peaks = peaks + seg_start
+        confirmed = peaks[(peaks >= self._final) & (peaks < self.count - self.distance)]
+        self._final = max(self._final, self.count - self.distance)
+        if self.last_peak is not None:
+            confirmed = confirmed[confirmed >= self.last_peak + self.distance]
+        if not len(confirmed):
+            return np.empty(0), np.empty(0)
+
+        self.beats += len(confirmed)
+        times = confirmed / self.fs
+        if self.last_peak is not None:
+            times = np.concatenate(([self.last_peak / self.fs], times))
+        self.last_peak = int(confirmed[-1])
+        rr = np.diff(times)
+        # Intervals outside the plausible range are missed or extra beats
+        plausible = (rr >= self.min_rr) & (rr <= self.max_rr)
+        for start, end in gaps:
+            plausible &= (times[1:] <= start) | (times[:-1] >= end)
+        self.rr.extend(zip(times[1:][plausible].tolist(), rr[plausible].tolist()))
+        return times[1:][plausible], rr[plausible]
+
+    def bpm(self, now=None):
+        # Median RR over the `window` seconds up to `now` (default: the newest
+        # sample); NaN until two beats are in
+        now = self.count / self.fs if now is None else now
+        recent = [rr for t, rr in self.rr if now - self.window <= t <= now]
+        return 60.0 / float(np.median(recent)) if recent else np.nan
+
+
+# SpO2 from raw MAX30102 red/IR intensities by the ratio of ratios,
+#   R = (AC_red / DC_red) / (AC_ir / DC_ir),   SpO2 = calibration(R),
+# instead of the sketch's redValue/680. Over each window, DC is the mean raw
+# intensity and AC the RMS of the band-passed (pulse band) intensity, so
+# breathing and slow drift do not count as pulse.
+#
+# Window sums come from prefix sums along the last axis, so every window
+# costs O(1) whatever its length and overlap, and leading axes (e.g. one row
+# per device) are processed in the same call.
+
+# SpO2 = polyval(calibration, R). The default is the common empirical line
+# 110 - 25 R; MAXIM_CALIBRATION is the quadratic from Maxim's reference code.
+CALIBRATION = (-25.0, 110.0)
+MAXIM_CALIBRATION = (-45.060, 30.354, 94.845)
+
+# Quality flags, combined bitwise per window
+NO_FINGER = 1       # IR level too low: nothing on the sensor
+SATURATED = 2       # ADC near full scale, AC is clipped
+LOW_PERFUSION = 4   # pulsatile part too small to measure reliably
+MOTION = 8          # pulsatile part implausibly large: movement, not blood
+OUT_OF_RANGE = 16   # calibration gave a value outside 70-100 %
+
+FLAG_NAMES = {NO_FINGER: 'no finger', SATURATED: 'saturated', LOW_PERFUSION: 'low perfusion',
+              MOTION: 'motion', OUT_OF_RANGE: 'out of range'}
+
+ADC_FULL_SCALE = (1 << 18) - 1
+MIN_IR_DC = 50_000
+# AC/DC of the IR channel (RMS perfusion index) outside this range is flagged
+PERFUSION_RANGE = (2e-4, 0.05)
+
+
+def window_means(x, window, hop):
+    # Mean of every window along the last axis; windows start every `hop` samples
+    x = np.asarray(x, dtype=np.float64)
+    starts = np.arange(0, x.shape[-1] - window + 1, hop)
+    # Offset by each row's first sample to keep the prefix sums well conditioned
+    offset = x[..., :1]
+    prefix = np.cumsum(x - offset, axis=-1)
+    prefix = np.concatenate((np.zeros(prefix.shape[:-1] + (1,)), prefix), axis=-1)
+    return (prefix[..., starts + window] - prefix[..., starts]) / window + offset
+
+
+def estimate_spo2(ir, red, window, hop, calibration=CALIBRATION, ir_ac=None, red_ac=None):
+    """SpO2, R and quality flags for every window of ir/red (same shape).
+
+    ir_ac/red_ac are the band-passed channels; they are computed here when
+    not given (streaming callers pass their own, filtered with carried state).
+    Leading axes are batch axes, so many devices' buffers can be stacked into
+    one call. SpO2 is NaN where there is no finger on the sensor.
+    """
+    ir = np.asarray(ir, dtype=np.float64)
+    red = np.asarray(red, dtype=np.float64)
+    if ir_ac is None:
+        ir_ac = BandpassFilter()(ir)
+    if red_ac is None:
+        red_ac = BandpassFilter()(red)
+
+    return spo2_from_means(window_means(ir, window, hop), window_means(red, window, hop),
+                           window_means(ir_ac * ir_ac, window, hop), window_means(red_ac * red_ac, window, hop),
+                           calibration)
+
+
+def spo2_from_means(dc_ir, dc_red, power_ir, power_red, calibration=CALIBRATION):
+    # SpO2, R and flags from per-window means of the raw channels (DC) and of
+    # the squared band-passed channels (AC power)
+    ac_ir, ac_red = np.sqrt(power_ir), np.sqrt(power_red)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pi_ir = ac_ir / dc_ir
+        ratio = (ac_red / dc_red) / pi_ir
+    spo2 = np.polyval(calibration, ratio)
+
+    flags = np.zeros(spo2.shape, dtype=np.uint8)
+    flags[dc_ir < MIN_IR_DC] |= NO_FINGER
+    flags[(dc_ir > 0.95 * ADC_FULL_SCALE) | (dc_red > 0.95 * ADC_FULL_SCALE)] |= SATURATED
+    flags[~(pi_ir >= PERFUSION_RANGE[0])] |= LOW_PERFUSION
+    flags[pi_ir > PERFUSION_RANGE[1]] |= MOTION
+    flags[~((spo2 >= 70) & (spo2 <= 100.5))] |= OUT_OF_RANGE
+    spo2 = np.where(flags & NO_FINGER, np.nan, np.clip(spo2, 0, 100))
+    return spo2, ratio, flags
+
+
+def describe_quality(flags):
+    flags = int(flags)
+    return ', '.join(name for bit, name in FLAG_NAMES.items() if flags & bit) or 'ok'
+
+
+class SpO2Estimator:
+    # Streaming estimate for one device (or a stack of devices along leading
+    # axes): samples are filtered as they arrive and only their running sums
+    # are kept (prefix sums of the raw channels and of the squared band-passed
+    # ones, rebased whenever windows are dropped). Nothing is evaluated until
+    # a window is complete; then every complete window is read off the sums
+    # in one go and only the overlap with the next window is kept.
+    def __init__(self, fs=SAMPLE_RATE, window=4.0, hop=1.0, calibration=CALIBRATION):
+        self.window = int(window * fs)
+        self.hop = int(hop * fs)
+        self.calibration = calibration
+        # IR and red stacked on a leading axis: one filter call per batch
+        self.filter = BandpassFilter(fs)
+        # Prefix sums of (ir, red, ir_ac**2, red_ac**2) minus _offset, stacked
+        # on the first axis; _prefix[..., :_count + 1] is in use
+        self._prefix = None
+        self._offset = None
+        self._count = 0
+        self._start = 0
+        self.spo2 = np.nan
+        self.flags = NO_FINGER
+
+    def update(self, ir, red):
+        # Returns (end sample index, SpO2, flags) for the windows completed by this batch
+        ir = np.asarray(ir, dtype=np.float64)
+        red = np.asarray(red, dtype=np.float64)
+        raw = np.stack((ir, red))
+        new = np.concatenate((raw, self.filter(raw) ** 2))
+        if self._prefix is None:
+            # Offset by the first samples to keep the sums well conditioned
+            self._offset = np.zeros(new.shape[:-1] + (1,))
+            self._offset[:2] = new[:2, ..., :1]
+            self._prefix = np.zeros(new.shape[:-1] + (self.window + self.hop + 1,))
+
+        n, k = self._count, new.shape[-1]
+        if n + k + 1 > self._prefix.shape[-1]:
+            grown = np.zeros(new.shape[:-1] + (max(n + k + 1, 2 * self._prefix.shape[-1]),))
+            grown[..., :n + 1] = self._prefix[..., :n + 1]
+            self._prefix = grown
+        prefix = self._prefix
+        prefix[..., n + 1:n + k + 1] = prefix[..., n:n + 1] + np.cumsum(new - self._offset, axis=-1)
+        n = self._count = n + k
+
+        if n < self.window:
+            empty = np.empty(new.shape[1:-1] + (0,))
+            return np.empty(0, dtype=np.intp), empty, empty.astype(np.uint8)
+        done = (n - self.window) // self.hop + 1
+        starts = np.arange(done) * self.hop
+        means = (prefix[..., starts + self.window] - prefix[..., starts]) / self.window + self._offset
+        spo2, _, flags = spo2_from_means(*means, self.calibration)
+        ends = self._start + starts + self.window
+
+        # Drop the samples no later window needs, rebasing the sums on the first kept one
+        drop = done * self.hop
+        prefix[..., :n - drop + 1] = prefix[..., drop:n + 1] - prefix[..., drop:drop + 1]
+        self._count -= drop
+        self._start += drop
+
+        if spo2.ndim == 1:
+            self.flags = int(flags[-1])
+            good = flags == 0
+            if good.any():
+                self.spo2 = float(spo2[good][-1])
+            elif self.flags & NO_FINGER:
+                self.spo2 = np.nan
+        return ends, spo2, flags
+
+
+class PpgAssembler:
+    # Counterpart of FrameAssembler for the binary frame stream: one output row
+    # per beat returned by PulseExtractor.update(), with the mean GSR since the
+    # previous beat, the BPM at that beat and the latest clean SpO2, so the
+    # monitoring page can store and chart it unchanged. The beats also feed an
+    # HrvTracker.
+    # Samples are timed by their frame sequence number, not by arrival: frames
+    # lost on the wire or dropped by the reader leave a gap that is filled by
+    # linear interpolation. Beat intervals spanning a gap longer than max_fill
+    # seconds are discarded, as a peak inside it may be missing or misplaced.
+    def __init__(self, fs=SAMPLE_RATE, decoder=None, calibration=CALIBRATION, max_fill=0.05):
+        self.fs = fs
+        self.max_fill = max_fill
+        self.decoder = decoder
+        self.pulse = PulseExtractor(fs)
+        self.oximeter = SpO2Estimator(fs, calibration=calibration)
+        self.hrv = HrvTracker()
+        self.latest = dict.fromkeys(CHANNELS)
+        self.origin = None
+        # GSR samples not yet averaged into a row, starting at sample _gsr_start;
+        # without beats only the last few seconds are kept
+        self._gsr = np.empty(0)
+        self._gsr_start = 0
+        self._gsr_keep = int(2 * self.pulse.max_rr * fs)
+        self._rows = []
+        # Last sample: sequence number, sample index and (gsr, ir, red)
+        self._last_seq = None
+        self._last_index = -1
+        self._last_values = None
+        self.gaps = deque()
+        self.lost = 0
+
+    @property
+    def malformed(self):
+        # Frames rejected by the CRC check
+        return self.decoder.crc_errors if self.decoder else 0
+
+    def _sample_indices(self, seq):
+        # Unwrapped sample index per frame; -1 for repeated or reordered frames
+        seq = seq.astype(np.int64)
+        previous = seq[0] - 1 if self._last_seq is None else self._last_seq
+        steps = np.diff(np.concatenate(([previous], seq))) % 65536
+        if ((steps == 0) | (steps >= 32768)).any():
+            # Rare: measure each step from the last frame kept
+            index = np.full(len(seq), -1, dtype=np.int64)
+            last, at = previous, self._last_index
+            for i, value in enumerate(seq.tolist()):
+                step = (value - last) % 65536
+                if 0 < step < 32768:
+                    at += step
+                    index[i], last = at, value
+            return index
+        return self._last_index + np.cumsum(steps)
+
+    def _fill(self, index, values):
+        # Samples on the contiguous index grid, gaps interpolated
+        grid = np.arange(self._last_index + 1, index[-1] + 1)
+        if len(grid) == len(index):
+            return grid, np.stack(values)
+        if self._last_values is not None:
+            index = np.concatenate(([self._last_index], index))
+            values = [np.concatenate(([last], v)) for last, v in zip(self._last_values, values)]
+        return grid, np.stack([np.interp(grid, index, v) for v in values])
+
+    def feed(self, times, frames):
+        # times: host arrival times of the frames; sample i was taken at origin + i / fs
+        if not len(frames):
+            return
+        index = self._sample_indices(frames['seq'])
+        fresh = index >= 0
+        if not fresh.any():
+            return
+        times, frames, index = times[fresh], frames[fresh], index[fresh]
+        if self.origin is None:
+            self.origin = float(times[0])
+            self._last_index = index[0] - 1
+
+        values = [frames[name].astype(float) for name in ('gsr', 'ir', 'red')]
+        previous = np.concatenate(([self._last_index], index[:-1]))
+        for before, after in zip(previous[index - previous > 1].tolist(), index[index - previous > 1].tolist()):
+            self.lost += after - before - 1
+            if after - before - 1 > self.max_fill * self.fs:
+                self.gaps.append((before / self.fs, after / self.fs))
+        grid, (gsr, ir, red) = self._fill(index, values)
+        self._last_seq = int(frames['seq'][-1])
+        self._last_index = int(index[-1])
+        self._last_values = [v[-1] for v in values]
+        # Gaps before the extractor's look-back and one more interval cannot touch new beats
+        horizon = (grid[0] - self.pulse.context) / self.fs - self.pulse.max_rr
+        while self.gaps and self.gaps[0][1] < horizon:
+            self.gaps.popleft()
+
+        beat_times, rr = self.pulse.update(ir, self.gaps)
+        self.hrv.add(beat_times, rr)
+        self.oximeter.update(ir, red)
+        if not np.isnan(self.oximeter.spo2):
+            self.latest['oxygen'] = self.oximeter.spo2
+        self._gsr = np.concatenate((self._gsr, gsr))
+        self.latest['gsr'] = float(gsr[-1])
+
+        for t in beat_times.tolist():
+            # GSR samples up to and including the beat's sample
+            n = int(round(t * self.fs)) - self._gsr_start + 1
+            gsr_mean = float(self._gsr[:n].mean()) if n > 0 else self.latest['gsr']
+            if n > 0:
+                self._gsr, self._gsr_start = self._gsr[n:], self._gsr_start + n
+            self._rows.append((self.origin + t, gsr_mean, self.pulse.bpm(t), self.oximeter.spo2))
+        excess = len(self._gsr) - self._gsr_keep
+        if excess > 0:
+            self._gsr, self._gsr_start = self._gsr[excess:], self._gsr_start + excess
+
+        bpm = self.pulse.bpm()
+        if not np.isnan(bpm):
+            self.latest['pulse'] = bpm
+
+    def pop_frames(self):
+        # Rows since the last call, in FrameAssembler.pop_frames() layout
+        rows, self._rows = self._rows, []
+        table = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        out = {'time': table[:, 0], 'label': [''] * len(rows), 'report': [''] * len(rows),
+               'gsr': table[:, 1], 'pulse': table[:, 2], 'oxygen': table[:, 3]}
+        for name in CHANNELS:
+            out['t_' + name] = out['time']
+        return out
+
+
+def frame_lines(frames):
+    # Raw frames as text, for the raw-data view and export
+    return [f"seq={s} gsr={g} ir={i} red={r}"
+            for s, g, i, r in zip(frames['seq'].tolist(), frames['gsr'].tolist(),
+                                  frames['ir'].tolist(), frames['red'].tolist())]
@@ -2,10 +2,9 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
-import serial
-import serial.tools.list_ports
 from datetime import datetime
-import plotly.express as px
+from serial_reader import SerialReader
+from line_protocol import LineParser
 
 # Configure page
 st.set_page_config(
@@ -75,6 +74,9 @@ if nav == '🏠 Home':
 
 # Biometric Stress Detection Page
 elif nav == '💓 Biometric Stress Detection':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
     st.header("💓 Biometric Stress Detection")
     
     # User Information Section
@@ -129,9 +131,14 @@ elif nav == '💓 Biometric Stress Detection':
         try:
             # Initialize connection
             ser = serial.Serial(port, 9600, timeout=1)
+            parser = LineParser()
             st.session_state.ser = ser
             st.success(f"Connected to {port}")
             
+            # Drain the port on a background thread so slow renders never stall ingestion
+            reader = SerialReader(ser).start()
+            st.session_state.reader = reader
+            
             # Initialize data storage
             if 'biometrics' not in st.session_state:
                 st.session_state.biometrics = {
@@ -180,36 +187,29 @@ elif nav == '💓 Biometric Stress Detection':
                 progress = min(elapsed / total_duration, 1.0)
                 progress_bar.progress(progress)
                 
-                # Read serial data for baseline
-                if ser.in_waiting:
-                    line = ser.readline().decode('utf-8').strip()
+                # Consume every line the reader thread has collected
+                for line in reader.drain():
                     raw_data_list.append(line)
                     st.session_state.biometrics['raw_data'].append(line)
                     
                     # Process different metrics for baseline
-                    if line.startswith("GSR="):
-                        try:
-                            gsr = int(line.split('=')[1].split()[0])
-                            baseline_values['gsr'].append(gsr)
-                        except:
-                            continue
+                    kind, value = parser.parse(line)
+                    if kind == 'gsr':
+                        gsr = int(value)
+                        baseline_values['gsr'].append(gsr)
                     
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse = int(line.split(':')[1])
-                            baseline_values['pulse'].append(pulse)
-                        except:
-                            continue
+                    elif kind == 'pulse':
+                        pulse = int(value)
+                        baseline_values['pulse'].append(pulse)
                     
-                    elif line.startswith("O2:"):
-                        try:
-                            oxygen = float(line.split(':')[1].replace('%', ''))
-                            baseline_values['oxygen'].append(oxygen)
-                        except:
-                            continue
+                    elif kind == 'oxygen':
+                        oxygen = value
+                        baseline_values['oxygen'].append(oxygen)
                 
                 # Update raw data display
                 raw_data_container.text("\n".join(raw_data_list[-20:]))  # Show last 20 lines
+                if reader.error:
+                    raise reader.error
                 time.sleep(0.1)
             
             # Calculate baseline averages
@@ -229,70 +229,60 @@ elif nav == '💓 Biometric Stress Detection':
                 remaining = max(0, total_duration - elapsed)
                 status_text.text(f"Time remaining: {int(remaining)} seconds")
                 
-                # Read serial data
-                if ser.in_waiting:
-                    line = ser.readline().decode('utf-8').strip()
+                # Consume every line the reader thread has collected
+                for line in reader.drain():
                     raw_data_list.append(line)
                     st.session_state.biometrics['raw_data'].append(line)
                     
                     # Process different metrics
-                    if line.startswith("GSR="):
-                        try:
-                            gsr = int(line.split('=')[1].split()[0])
-                            st.session_state.biometrics['gsr'].append(gsr)
-                            st.session_state.biometrics['time'].append(elapsed)
-                            
-                            with gsr_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>GSR (Stress)</h3>
-                                    <h1>{gsr} µS</h1>
-                                    <p>Baseline: {baseline_gsr:.1f} µS</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # Stress assessment
-                                if abs(gsr - baseline_gsr) < 50:
-                                    status_card.success("😊 Normal Stress Levels")
-                                elif abs(gsr - baseline_gsr) < 150:
-                                    status_card.warning("😐 Elevated Stress")
-                                else:
-                                    status_card.error("😨 High Stress Alert")
+                    kind, value = parser.parse(line)
+                    if kind == 'gsr':
+                        gsr = int(value)
+                        st.session_state.biometrics['gsr'].append(gsr)
+                        st.session_state.biometrics['time'].append(elapsed)
                         
-                        except:
-                            continue
-                    
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse = int(line.split(':')[1])
-                            st.session_state.biometrics['pulse'].append(pulse)
+                        with gsr_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>GSR (Stress)</h3>
+                                <h1>{gsr} µS</h1>
+                                <p>Baseline: {baseline_gsr:.1f} µS</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                             
-                            with pulse_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>Heart Rate</h3>
-                                    <h1>{pulse} BPM</h1>
-                                    <p>Baseline: {baseline_pulse:.1f} BPM</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        except:
-                            continue
+                            # Stress assessment
+                            if abs(gsr - baseline_gsr) < 50:
+                                status_card.success("😊 Normal Stress Levels")
+                            elif abs(gsr - baseline_gsr) < 150:
+                                status_card.warning("😐 Elevated Stress")
+                            else:
+                                status_card.error("😨 High Stress Alert")
                     
-                    elif line.startswith("O2:"):
-                        try:
-                            oxygen = float(line.split(':')[1].replace('%', ''))
-                            st.session_state.biometrics['oxygen'].append(oxygen)
-                            
-                            with oxygen_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>Oxygen Saturation</h3>
-                                    <h1>{oxygen}%</h1>
-                                    <p>Baseline: {baseline_oxygen:.1f}%</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        except:
-                            continue
+                    elif kind == 'pulse':
+                        pulse = int(value)
+                        st.session_state.biometrics['pulse'].append(pulse)
+                        
+                        with pulse_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>Heart Rate</h3>
+                                <h1>{pulse} BPM</h1>
+                                <p>Baseline: {baseline_pulse:.1f} BPM</p>
+                            </div>
+                            """, unsafe_allow_html=True)
+                    
+                    elif kind == 'oxygen':
+                        oxygen = value
+                        st.session_state.biometrics['oxygen'].append(oxygen)
+                        
+                        with oxygen_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>Oxygen Saturation</h3>
+                                <h1>{oxygen}%</h1>
+                                <p>Baseline: {baseline_oxygen:.1f}%</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                 
                 # Update raw data display
                 raw_data_container.text("\n".join(raw_data_list[-20:]))
@@ -336,6 +326,8 @@ elif nav == '💓 Biometric Stress Detection':
                     
                     chart.plotly_chart(fig, use_container_width=True)
                 
+                if reader.error:
+                    raise reader.error
                 time.sleep(0.1)
             
             # Session complete
@@ -423,6 +415,9 @@ elif nav == '💓 Biometric Stress Detection':
             st.error(f"Error: {str(e)}")
         
         finally:
+            if 'reader' in st.session_state:
+                st.session_state.reader.stop()
+                del st.session_state.reader
             if 'ser' in st.session_state:
                 st.session_state.ser.close()
                 del st.session_state.ser
@@ -0,0 +1,66 @@
+import numpy as np
+
+
+# Fixed-capacity sample store for the monitoring pages.
+# Every column is allocated twice its capacity and each sample is written to
+# both halves, so the most recent N samples are always one contiguous slice:
+# views never copy and memory stays flat however long the session runs.
+class RingBuffer:
+    def __init__(self, capacity, channels=('gsr', 'pulse', 'oxygen'), dtype=np.float32):
+        self.capacity = capacity
+        self.channels = tuple(channels)
+        self.columns = {'time': np.zeros(2 * capacity, dtype=np.float64)}
+        for name in self.channels:
+            self.columns[name] = np.full(2 * capacity, np.nan, dtype=dtype)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _write(self, pos, name, value):
+        col = self.columns[name]
+        col[pos] = value
+        col[pos + self.capacity] = value
+
+    def append(self, time, **values):
+        pos = self.count % self.capacity
+        self._write(pos, 'time', time)
+        for name in self.channels:
+            self._write(pos, name, values.get(name, np.nan))
+        self.count += 1
+
+    def extend(self, times, **values):
+        # Batch append; only the last `capacity` samples of the batch can survive
+        times = np.asarray(times, dtype=np.float64)[-self.capacity:]
+        k = len(times)
+        if not k:
+            return
+        pos = (self.count + np.arange(k)) % self.capacity
+        self._write(pos, 'time', times)
+        for name in self.channels:
+            column = values.get(name)
+            column = np.nan if column is None else np.asarray(column)[-k:]
+            self._write(pos, name, column)
+        self.count += k
+
+    def update_last(self, name, value):
+        # Fill in a channel on the most recent sample
+        if self.count:
+            self._write((self.count - 1) % self.capacity, name, value)
+
+    def view(self, name, last=None):
+        n = len(self) if last is None else min(len(self), last)
+        stop = (self.count - 1) % self.capacity + 1 + self.capacity
+        return self.columns[name][stop - n:stop]
+
+    def frame(self, last=None):
+        return {name: self.view(name, last) for name in self.columns}
+
+    def last(self, name, default=0):
+        # Latest recorded value of a channel, skipping samples where it is missing
+        values = self.view(name)
+        filled = np.flatnonzero(~np.isnan(values))
+        return values[filled[-1]].item() if len(filled) else default
+
+    def clear(self):
+        self.count = 0
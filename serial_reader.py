@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from binary_protocol import FRAME_DTYPE, FrameDecoder
+
+
+BAUD_RATES = [9600, 115200, 230400, 500000, 1000000]
+
+
+def negotiate_baud(ser, baud, timeout=4.0):
+    # The sketch listens for BAUD=<rate> for a moment after reset (opening the
+    # port resets the board) and answers "BAUD OK <rate>" before switching.
+    # Returns False and leaves the port at its current rate if it never answers.
+    if baud == ser.baudrate:
+        return True
+    request = f"BAUD={baud}\n".encode()
+    reply = f"BAUD OK {baud}"
+    deadline = time.time() + timeout
+    next_send = 0
+    while time.time() < deadline:
+        if time.time() >= next_send:
+            ser.write(request)
+            next_send = time.time() + 0.5
+        line = ser.readline().decode('utf-8', errors='replace').strip()
+        if line == reply:
+            ser.baudrate = baud
+            ser.reset_input_buffer()
+            return True
+    return False
+
+
+# Background reader for the sensor's serial port.
+# The Streamlit loop only renders; this thread keeps draining the port so
+# readings never back up behind a slow chart refresh. Each line is stamped
+# with its arrival time here, not when the UI gets round to it.
+#
+# bulk=False reads one line per readline() call. bulk=True reads whatever the
+# port has buffered into a reusable bytearray and splits it into lines in one
+# go, which keeps up with high baud rates. binary=True reads the same way but
+# decodes binary frames (binary_protocol) instead of lines; use drain_frames().
+class SerialReader:
+    def __init__(self, ser, maxsize=5000, bulk=False, chunk_size=4096, binary=False):
+        self.ser = ser
+        self.bulk = bulk or binary
+        self.binary = binary
+        self.decoder = FrameDecoder() if binary else None
+        self.chunk_size = chunk_size
+        # Each item is (arrival_time, [lines]): one line in line mode, a whole read in
+        # bulk mode; in binary mode the list is a FRAME_DTYPE array
+        self.lines = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.error = None
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.started = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        # Bytes that queued up before the session (e.g. while nobody had the
+        # port open) are stale; readings start from now
+        self.ser.reset_input_buffer()
+        self.started = time.time()
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        # Bounded queue: if the UI falls far behind, keep the newest data
+        try:
+            self.lines.put_nowait(item)
+        except queue.Full:
+            try:
+                self.dropped += len(self.lines.get_nowait()[1])
+            except queue.Empty:
+                pass
+            self.lines.put_nowait(item)
+
+    def _run(self):
+        try:
+            if self.binary:
+                self._run_binary()
+            elif self.bulk:
+                self._run_bulk()
+            else:
+                self._run_lines()
+        except Exception as e:
+            self.error = e
+
+    def _run_lines(self):
+        while not self._stop.is_set():
+            raw = self.ser.readline()
+            if raw:
+                self.bytes_read += len(raw)
+                self.lines_read += 1
+                self._put((time.time(), [raw.decode('utf-8', errors='replace').strip()]))
+
+    def _run_bulk(self):
+        chunk = bytearray(self.chunk_size)
+        view = memoryview(chunk)
+        pending = bytearray()
+        while not self._stop.is_set():
+            # Block for at least one byte (up to the port timeout), then take the rest
+            want = min(max(self.ser.in_waiting, 1), self.chunk_size)
+            n = self.ser.readinto(view[:want])
+            if not n:
+                continue
+            t = time.time()
+            self.bytes_read += n
+            pending += view[:n]
+            cut = pending.rfind(b'\n')
+            if cut < 0:
+                continue
+            lines = pending[:cut].decode('utf-8', errors='replace').split('\n')
+            del pending[:cut + 1]
+            self.lines_read += len(lines)
+            self._put((t, [line.strip() for line in lines]))
+
+    def _run_binary(self):
+        chunk = bytearray(self.chunk_size)
+        view = memoryview(chunk)
+        while not self._stop.is_set():
+            want = min(max(self.ser.in_waiting, 1), self.chunk_size)
+            n = self.ser.readinto(view[:want])
+            if not n:
+                continue
+            t = time.time()
+            self.bytes_read += n
+            frames = self.decoder.feed(view[:n])
+            if len(frames):
+                self.lines_read += len(frames)
+                self._put((t, frames))
+
+    def rates(self):
+        # Average (bytes/sec, lines/sec) since the reader started
+        elapsed = time.time() - self.started if self.started else 0
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return self.bytes_read / elapsed, self.lines_read / elapsed
+
+    def drain_timed(self, max_lines=None):
+        # (arrival_time, line) pairs received since the last call, oldest first.
+        # max_lines is checked per read, so a bulk read may overshoot it.
+        out = []
+        while max_lines is None or len(out) < max_lines:
+            try:
+                t, lines = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            out.extend((t, line) for line in lines)
+        return out
+
+    def drain_frames(self):
+        # Binary mode: (arrival times, frames) received since the last call
+        times, frames = [], []
+        while True:
+            try:
+                t, batch = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            times.append(np.full(len(batch), t))
+            frames.append(batch)
+        if not frames:
+            return np.empty(0), np.empty(0, dtype=FRAME_DTYPE)
+        return np.concatenate(times), np.concatenate(frames)
+
+    def drain(self, max_lines=None):
+        return [line for _, line in self.drain_timed(max_lines)]
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    athlete TEXT NOT NULL,
+    age INTEGER,
+    gender TEXT,
+    started REAL NOT NULL,
+    baseline_gsr REAL,
+    baseline_pulse REAL,
+    baseline_oxygen REAL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    athlete TEXT NOT NULL,
+    time REAL NOT NULL,
+    gsr REAL,
+    pulse REAL,
+    oxygen REAL,
+    quality INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS raw_lines (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    time REAL NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_athlete_time ON samples (athlete, time);
+CREATE INDEX IF NOT EXISTS samples_session_time ON samples (session_id, time);
+CREATE INDEX IF NOT EXISTS raw_lines_session_time ON raw_lines (session_id, time);
+"""
+
+SAMPLE_DTYPES = {'time': 'float64', 'gsr': 'float64', 'pulse': 'float64', 'oxygen': 'float64', 'quality': 'int64'}
+
+
+# Local SQLite store for monitoring sessions, so they survive a browser refresh.
+# WAL mode lets the dashboard read history while a session is being written.
+# Rows are buffered and written in one transaction per batch; times are Unix
+# timestamps so any window can be queried through the (athlete, time) index.
+# Readings rejected by the artifact checks are stored as NULL, with the
+# reasons in the row's quality flags (artifacts.py).
+# One store is shared by every browser session, so the buffers and the shared
+# connection are only touched under a lock; streamed exports read through a
+# connection of their own.
+class SessionStore:
+    def __init__(self, path='biometrics.db', batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Databases written before quality flags were recorded
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(samples)")]
+        if 'quality' not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE samples ADD COLUMN quality INTEGER NOT NULL DEFAULT 0")
+        self._samples = []
+        self._raw = []
+        self._last_flush = time.time()
+        self._lock = threading.RLock()
+
+    def start_session(self, athlete, age=None, gender=None, started=None):
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO sessions (athlete, age, gender, started) VALUES (?, ?, ?, ?)",
+                (athlete, age, gender, started or time.time())
+            )
+        return cur.lastrowid
+
+    def set_baseline(self, session_id, gsr, pulse, oxygen):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE sessions SET baseline_gsr = ?, baseline_pulse = ?, baseline_oxygen = ? WHERE id = ?",
+                (float(gsr), float(pulse), float(oxygen), session_id)
+            )
+
+    def add_samples(self, session_id, athlete, times, gsr, pulse, oxygen, quality=None):
+        # Columns from one ingestion step; NaN readings are stored as NULL
+        n = len(times)
+        quality = np.zeros(n, dtype=np.int64) if quality is None else np.asarray(quality, dtype=np.int64)
+        rows = list(zip([session_id] * n, [athlete] * n,
+                        np.asarray(times, dtype=float).tolist(),
+                        np.asarray(gsr, dtype=float).tolist(),
+                        np.asarray(pulse, dtype=float).tolist(),
+                        np.asarray(oxygen, dtype=float).tolist(),
+                        quality.tolist()))
+        with self._lock:
+            self._samples.extend(rows)
+            self._maybe_flush()
+
+    def add_raw(self, session_id, timed_lines):
+        # (time, line) pairs as returned by SerialReader.drain_timed()
+        rows = [(session_id, t, line) for t, line in timed_lines]
+        with self._lock:
+            self._raw.extend(rows)
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        pending = len(self._samples) + len(self._raw)
+        if pending >= self.batch_size or (pending and time.time() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            with self.conn:
+                if self._samples:
+                    self.conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)", self._samples)
+                if self._raw:
+                    self.conn.executemany("INSERT INTO raw_lines VALUES (?, ?, ?)", self._raw)
+            self._samples = []
+            self._raw = []
+            self._last_flush = time.time()
+
+    def sessions(self, athlete=None):
+        sql = "SELECT * FROM sessions"
+        params = ()
+        if athlete is not None:
+            sql += " WHERE athlete = ?"
+            params = (athlete,)
+        with self._lock:
+            return pd.read_sql_query(sql + " ORDER BY started DESC", self.conn, params=params)
+
+    def session(self, session_id):
+        with self._lock:
+            cur = self.conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
+            row = cur.fetchone()
+        return None if row is None else dict(zip([d[0] for d in cur.description], row))
+
+    def _samples_query(self, session_id=None, athlete=None, start=None, end=None):
+        where, params = [], []
+        if session_id is not None:
+            where.append("session_id = ?")
+            params.append(session_id)
+        if athlete is not None:
+            where.append("athlete = ?")
+            params.append(athlete)
+        if start is not None:
+            where.append("time >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("time < ?")
+            params.append(end)
+        sql = "SELECT time, gsr, pulse, oxygen, quality FROM samples"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return sql + " ORDER BY time", params
+
+    def samples(self, session_id=None, athlete=None, start=None, end=None):
+        # Samples for one session or one athlete, optionally limited to [start, end)
+        sql, params = self._samples_query(session_id, athlete, start, end)
+        with self._lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def _iter_query(self, sql, params, chunk_size, dtype=None):
+        # Chunks are fetched while the caller writes out the previous one, so
+        # they come through a connection of their own (WAL lets it read while
+        # other sessions write through the shared one)
+        conn = sqlite3.connect(self.path)
+        try:
+            empty = True
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_size, dtype=dtype):
+                empty = False
+                yield chunk
+            # Always at least one chunk, so exports of an empty session keep
+            # their columns (some pandas versions yield nothing for no rows)
+            if empty:
+                yield pd.read_sql_query(sql, conn, params=params, dtype=dtype)
+        finally:
+            conn.close()
+
+    def iter_samples(self, session_id=None, athlete=None, start=None, end=None, chunk_size=50_000):
+        # Same rows as samples(), as DataFrames of at most chunk_size rows
+        self.flush()
+        sql, params = self._samples_query(session_id, athlete, start, end)
+        # Fixed dtypes so a chunk where a channel is all NULL still matches the others
+        return self._iter_query(sql, params, chunk_size, SAMPLE_DTYPES)
+
+    def iter_raw(self, session_id, chunk_size=50_000):
+        self.flush()
+        return self._iter_query("SELECT time, line FROM raw_lines WHERE session_id = ? ORDER BY rowid",
+                                (session_id,), chunk_size)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.conn.close()
@@ -0,0 +1,259 @@
+import argparse
+import os
+import pty
+import threading
+import time
+import tty
+
+import numpy as np
+import pandas as pd
+
+from binary_protocol import SAMPLE_RATE, encode_frame
+
+
+# Stand-in for GSR_Temp_Pulse_Oximeter.ino on a plain Linux box.
+# Each simulated device is a pseudo-terminal: the dashboards open the printed
+# /dev/pts path exactly like a real port and see the sketch's line format.
+#
+#   python simulator.py devices -n 4 --rate 5      live random readings
+#   python simulator.py devices --binary --rate 100 binary frames with a PPG waveform
+#   python simulator.py replay raw_biometrics.csv  replay a "Download Raw Data" export
+#   python simulator.py bench -n 20 --rate 50      end-to-end ingestion/render throughput
+
+def stress_label(gsr):
+    # Same thresholds and padding as the sketch
+    if 10 < gsr <= 100:
+        return "Low Stress            "
+    if 100 < gsr <= 200:
+        return "Moderate stress    "
+    if 200 < gsr < 600:
+        return "High stress        "
+    return None
+
+
+def cycle_lines(gsr, ir, red):
+    # One device cycle, as the sketch prints it
+    if gsr >= 600:
+        return ["GSR=NF"]
+    if gsr <= 10:
+        return ["Place fingers...            "]
+    return [f"GSR={gsr} uS    ", stress_label(gsr), f"Pulse:{ir // 1100}", f"O2:{red // 680}%", ""]
+
+
+def pulse_shape(phase):
+    # One PPG beat over phase 0..1: systolic peak and a smaller dicrotic wave
+    return np.exp(-((phase - 0.2) / 0.08) ** 2) + 0.3 * np.exp(-((phase - 0.55) / 0.1) ** 2)
+
+
+class SimulatedDevice:
+    def __init__(self, seed=None, binary=False, rate=SAMPLE_RATE):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        # A port nobody reads fills the pty buffer; drop output then (like a
+        # UART with nothing listening) instead of stalling every device
+        os.set_blocking(self.master, False)
+        self.path = os.ttyname(self.slave)
+        self.binary = binary
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+        self.gsr = float(self.rng.uniform(60, 250))
+        # Binary mode streams a PPG waveform at this heart rate and SpO2
+        self.hr = float(self.rng.uniform(60, 90))
+        self.spo2 = float(self.rng.uniform(95, 99))
+        self.phase = 0.0
+        self.seq = 0
+        self.bytes_written = 0
+        self.lines_written = 0
+        self.writes_dropped = 0
+
+    def _sample(self):
+        # Slow random walk for GSR; IR/red chosen so Pulse and O2 land in normal ranges
+        self.gsr = float(np.clip(self.gsr + self.rng.normal(0, 8), 1, 650))
+        ir = int(self.rng.normal(80, 6) * 1100)
+        red = int(self.rng.uniform(95, 100) * 680)
+        return int(self.gsr), ir, red
+
+    def _ppg_sample(self):
+        # Raw IR/red intensities: DC level minus the pulsatile absorption. The
+        # red/IR modulation ratio R follows SpO2 = 110 - 25 R.
+        self.hr = float(np.clip(self.hr + self.rng.normal(0, 0.05), 50, 150))
+        self.phase = (self.phase + self.hr / 60 / self.rate) % 1
+        pulse = pulse_shape(self.phase)
+        ratio = (110 - self.spo2) / 25
+        ir = 120000 - 600 * pulse + self.rng.normal(0, 30)
+        red = 66000 - 66000 * ratio * 600 / 120000 * pulse + self.rng.normal(0, 20)
+        return int(ir), int(red)
+
+    def write(self, data):
+        # Returns False when the pty buffer was full and the data (or its end) was dropped
+        try:
+            written = os.write(self.master, data)
+        except BlockingIOError:
+            written = 0
+        self.bytes_written += written
+        if written < len(data):
+            self.writes_dropped += 1
+            return False
+        return True
+
+    def emit_cycle(self):
+        gsr, ir, red = self._sample()
+        if self.binary:
+            ir, red = self._ppg_sample()
+            self.write(encode_frame(self.seq, gsr, ir, red))
+            self.seq += 1
+            return
+        self.emit_lines(cycle_lines(gsr, ir, red))
+
+    def emit_lines(self, lines):
+        if self.write(''.join(line + '\r\n' for line in lines).encode()):
+            self.lines_written += len(lines)
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def run_devices(devices, rate, stop):
+    # Emit one cycle per device every 1/rate seconds until stop is set
+    interval = 1.0 / rate
+    next_tick = time.time()
+    while not stop.is_set():
+        for device in devices:
+            device.emit_cycle()
+        next_tick += interval
+        time.sleep(max(0.0, next_tick - time.time()))
+
+
+def replay_lines(path):
+    # Raw_Data column of the dashboard's raw export; blank lines end a cycle
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return df['Raw_Data'].tolist()
+
+
+def run_replay(device, lines, rate, loop, stop):
+    # Replays cycle by cycle, rate cycles per second
+    cycles, current = [], []
+    for line in lines:
+        current.append(line)
+        if line.strip() == '' or line.startswith(('GSR=NF', 'Place fingers')):
+            cycles.append(current)
+            current = []
+    if current:
+        cycles.append(current)
+
+    interval = 1.0 / rate
+    while not stop.is_set():
+        for cycle in cycles:
+            if stop.is_set():
+                break
+            device.emit_lines(cycle)
+            time.sleep(interval)
+        if not loop:
+            break
+
+
+class _NullPlaceholder:
+    # Render sink for the benchmark: the figure is rebuilt but not shipped to a browser
+    def plotly_chart(self, fig, **kwargs):
+        fig.to_dict()
+
+
+def bench(n, rate, seconds, bulk):
+    from device_manager import DeviceManager
+    from live_chart import StreamingChart
+
+    devices = [SimulatedDevice(seed=i) for i in range(n)]
+    stop = threading.Event()
+    writer = threading.Thread(target=run_devices, args=(devices, rate, stop), daemon=True)
+    manager = DeviceManager({d.path: f"sim{i}" for i, d in enumerate(devices)}, bulk=bulk).start()
+    chart = StreamingChart({'GSR': '#1f77b4', 'Pulse': '#ff7f0e', 'Oxygen': '#2ca02c'}, refresh_interval=0)
+    placeholder = _NullPlaceholder()
+
+    writer.start()
+    start = time.time()
+    frames = renders = 0
+    render_time = 0.0
+    samples = manager.samples['sim0']
+    charted = 0
+    while time.time() < start + seconds:
+        frames += manager.poll(start)
+        # Only the frames this poll added to the first device
+        new = min(samples.count - charted, len(samples))
+        charted = samples.count
+        if new:
+            chart.extend('GSR', samples.view('time', last=new), samples.view('gsr', last=new))
+        t = time.perf_counter()
+        if chart.render(placeholder):
+            renders += 1
+            render_time += time.perf_counter() - t
+        time.sleep(0.05)
+    stop.set()
+    writer.join()
+    time.sleep(0.2)
+    frames += manager.poll(start)
+    elapsed = time.time() - start
+    received = sum(r.lines_read for r in manager.readers.values())
+    manager.stop()
+
+    written = sum(d.lines_written for d in devices)
+    dropped = sum(d.writes_dropped for d in devices)
+    print(f"devices: {n}, rate: {rate} cycles/sec each, reader: {'bulk' if bulk else 'line'}")
+    print(f"lines written:  {written:,} ({written / elapsed:,.0f}/sec)")
+    print(f"lines read:     {received:,} ({received / elapsed:,.0f}/sec)")
+    print(f"frames stored:  {frames:,} ({frames / elapsed:,.0f}/sec)")
+    if dropped:
+        print(f"writes dropped: {dropped:,} (pty buffer full)")
+    if renders:
+        print(f"chart renders:  {renders} ({render_time / renders * 1000:.1f} ms each)")
+    for d in devices:
+        d.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated GSR/Pulse/O2 serial devices")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    devices_cmd = sub.add_parser('devices', help="live random readings on N pseudo-terminals")
+    devices_cmd.add_argument('-n', '--count', type=int, default=1)
+    devices_cmd.add_argument('--rate', type=float, default=1.0, help="cycles per second per device")
+    devices_cmd.add_argument('--binary', action='store_true', help="send binary frames instead of text")
+
+    replay_cmd = sub.add_parser('replay', help="replay a raw-data CSV export")
+    replay_cmd.add_argument('csv')
+    replay_cmd.add_argument('--rate', type=float, default=1.0, help="cycles per second")
+    replay_cmd.add_argument('--loop', action='store_true')
+
+    bench_cmd = sub.add_parser('bench', help="measure end-to-end ingestion and render throughput")
+    bench_cmd.add_argument('-n', '--count', type=int, default=20)
+    bench_cmd.add_argument('--rate', type=float, default=10.0, help="cycles per second per device")
+    bench_cmd.add_argument('--seconds', type=float, default=10.0)
+    bench_cmd.add_argument('--bulk', action='store_true', help="use bulk reads")
+
+    args = parser.parse_args()
+    if args.command == 'bench':
+        bench(args.count, args.rate, args.seconds, args.bulk)
+        return
+
+    stop = threading.Event()
+    if args.command == 'devices':
+        devices = [SimulatedDevice(binary=args.binary, rate=args.rate) for _ in range(args.count)]
+        worker = threading.Thread(target=run_devices, args=(devices, args.rate, stop), daemon=True)
+    else:
+        devices = [SimulatedDevice()]
+        worker = threading.Thread(target=run_replay, daemon=True,
+                                  args=(devices[0], replay_lines(args.csv), args.rate, args.loop, stop))
+    for device in devices:
+        print(device.path)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+    for device in devices:
+        device.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
 import time
-import serial
-import serial.tools.list_ports
 from datetime import datetime
+from line_protocol import LineParser
+from olympic_data import build_medal_cubes, dataset_version, load_athlete_events, load_medal_cubes
+from model_registry import ModelRegistry, fingerprint
+from weight_predictor import fit, predict_interval, score
 
 # Configure page
 st.set_page_config(
@@ -58,10 +55,11 @@ nav = st.sidebar.radio("**Navigation**", [
 ])
 
 # Load Olympic data
-@st.cache_data
+# Not wrapped in st.cache_data: memory-mapping the cached binary copy is
+# cheaper than the copy st.cache_data hands back on every rerun
 def load_olympic_data():
     try:
-        data = pd.read_csv('athlete_events.csv')
+        data = load_athlete_events('athlete_events.csv')
         return data
     except:
         return pd.DataFrame({
@@ -84,6 +82,11 @@ def load_olympic_data():
 
 data = load_olympic_data()
 
+# Fitted models, shared across reruns and sessions
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry()
+
 # Home Page
 if nav == '🏠 Home':
     col1, col2 = st.columns([1, 3])
@@ -123,6 +126,7 @@ if nav == '🏠 Home':
 
 # Exploratory Data Analysis Page
 elif nav == '🔍 Exploratory Data Analysis':
+    import plotly.express as px
     st.header('🔍 Exploratory Data Analysis')
     
     st.subheader("Dataset Overview")
@@ -139,26 +143,26 @@ elif nav == '🔍 Exploratory Data Analysis':
                            ["Histogram", "Bar Plot", "Scatter Plot", "Box Plot"])
     
     if plot_type == "Histogram":
-        column = st.selectbox("Select Column", data.select_dtypes(include=['int64', 'float64']).columns)
+        column = st.selectbox("Select Column", data.select_dtypes('number').columns)
         fig = px.histogram(data, x=column, title=f"Distribution of {column}")
         st.plotly_chart(fig)
         
     elif plot_type == "Bar Plot":
-        column = st.selectbox("Select Column", data.select_dtypes(include=['object']).columns)
+        column = st.selectbox("Select Column", data.select_dtypes(include=['object', 'category']).columns)
         fig = px.bar(data[column].value_counts(), title=f"Count of {column}")
         st.plotly_chart(fig)
         
     elif plot_type == "Scatter Plot":
         col1, col2 = st.columns(2)
         with col1:
-            x_axis = st.selectbox("X Axis", data.select_dtypes(include=['int64', 'float64']).columns)
+            x_axis = st.selectbox("X Axis", data.select_dtypes('number').columns)
         with col2:
-            y_axis = st.selectbox("Y Axis", data.select_dtypes(include=['int64', 'float64']).columns)
+            y_axis = st.selectbox("Y Axis", data.select_dtypes('number').columns)
         fig = px.scatter(data, x=x_axis, y=y_axis, title=f"{y_axis} vs {x_axis}")
         st.plotly_chart(fig)
         
     elif plot_type == "Box Plot":
-        column = st.selectbox("Select Column", data.select_dtypes(include=['int64', 'float64']).columns)
+        column = st.selectbox("Select Column", data.select_dtypes('number').columns)
         fig = px.box(data, y=column, title=f"Box Plot of {column}")
         st.plotly_chart(fig)
 
@@ -170,7 +174,7 @@ elif nav == '🧹 Data Preprocessing':
     missing_cols = data.columns[data.isnull().any()].tolist()
     selected_col = st.selectbox("Select Column", missing_cols)
     
-    if data[selected_col].dtype in ['int64', 'float64']:
+    if pd.api.types.is_numeric_dtype(data[selected_col]):
         method = st.radio("Handling Method", 
                          ["Mean", "Median", "Drop Rows"])
     else:
@@ -201,11 +205,17 @@ elif nav == '🧹 Data Preprocessing':
 
 # Trends Page
 elif nav == '📈 Trends':
+    import plotly.express as px
     st.header('📈 Trends Analysis')
     
     st.subheader("Medal Count by Country")
     if 'Medal' in data.columns:
-        medal_counts = data[data['Medal'].notnull()]['Team'].value_counts().head(20)
+        # Precomputed per dataset version; the built-in sample data is small enough to count directly
+        try:
+            medal_cubes = load_medal_cubes('athlete_events.csv')
+        except FileNotFoundError:
+            medal_cubes = build_medal_cubes(data)
+        medal_counts = medal_cubes['Team']['Total'].head(20)
         fig = px.bar(medal_counts, title="Top 20 Countries by Medal Count")
         st.plotly_chart(fig)
     else:
@@ -230,28 +240,30 @@ elif nav == '📈 Trends':
 
 # Prediction Page
 elif nav == '🔮 Prediction':
+    import plotly.express as px
     st.header('🔮 Performance Prediction')
     
     st.subheader("Linear Regression Model")
     
     if 'Height' in data.columns and 'Weight' in data.columns:
-        X = data[['Height']]
-        y = data['Weight']
-        
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        model = LinearRegression()
-        model.fit(X_train, y_train)
+        # Trained once per dataset version; a slider move only evaluates the fitted line
+        try:
+            version = dataset_version('athlete_events.csv')
+        except FileNotFoundError:
+            version = fingerprint(data['Height'], data['Weight'])
+        model = get_model_registry().get('height_weight_ols', version,
+                                         lambda: fit(data['Height'], data['Weight']))
         
-        st.write(f"Model R-squared: {model.score(X_test, y_test):.2f}")
+        st.write(f"Model R-squared: {model['r2']:.2f}")
         
         height_input = st.slider("Select Height (cm)", 
                                min_value=int(data['Height'].min()), 
                                max_value=int(data['Height'].max()),
                                value=180)
         
-        predicted_weight = model.predict([[height_input]])[0]
-        st.write(f"Predicted Weight for {height_input}cm: {predicted_weight:.1f}kg")
+        predicted_weight, low, high = (float(v) for v in predict_interval(model, height_input))
+        st.write(f"Predicted Weight for {height_input}cm: {predicted_weight:.1f}kg "
+                 f"(95% prediction interval {low:.1f}-{high:.1f}kg)")
         
         fig = px.scatter(x=data['Height'], y=data['Weight'], 
                         labels={'x': 'Height (cm)', 'y': 'Weight (kg)'},
@@ -260,11 +272,26 @@ elif nav == '🔮 Prediction':
                        mode='markers', marker=dict(color='red', size=15),
                        name='Prediction')
         st.plotly_chart(fig)
+
+        # Whole squad in one vectorized call
+        squad_file = st.file_uploader("Score a squad (CSV with a Height column in cm)", type='csv')
+        if squad_file is not None:
+            squad = pd.read_csv(squad_file)
+            if 'Height' in squad.columns:
+                scored = score(model, squad)
+                st.dataframe(scored)
+                st.download_button("Download Predictions", scored.to_csv(index=False),
+                                   "squad_predictions.csv", "text/csv")
+            else:
+                st.warning("The CSV needs a Height column")
     else:
         st.warning("Required columns (Height and Weight) not available")
 
 # Biometric Monitoring Page
 elif nav == '💓 Stress-O2-Pulse Monitoring':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
     st.header("💓 Athlete Biometric Monitoring")
     
     # Athlete Information Section
@@ -319,6 +346,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         try:
             # Initialize connection
             ser = serial.Serial(port, 9600, timeout=1)
+            parser = LineParser()
             st.session_state.ser = ser
             st.success(f"Connected to {port}")
             
@@ -377,26 +405,18 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                     st.session_state.biometrics['raw_data'].append(line)
                     
                     # Process different metrics for baseline
-                    if line.startswith("GSR="):
-                        try:
-                            gsr = int(line.split('=')[1].split()[0])
-                            baseline_values['gsr'].append(gsr)
-                        except:
-                            continue
+                    kind, value = parser.parse(line)
+                    if kind == 'gsr':
+                        gsr = int(value)
+                        baseline_values['gsr'].append(gsr)
                     
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse = int(line.split(':')[1])
-                            baseline_values['pulse'].append(pulse)
-                        except:
-                            continue
+                    elif kind == 'pulse':
+                        pulse = int(value)
+                        baseline_values['pulse'].append(pulse)
                     
-                    elif line.startswith("O2:"):
-                        try:
-                            oxygen = float(line.split(':')[1].replace('%', ''))
-                            baseline_values['oxygen'].append(oxygen)
-                        except:
-                            continue
+                    elif kind == 'oxygen':
+                        oxygen = value
+                        baseline_values['oxygen'].append(oxygen)
                 
                 # Update raw data display
                 raw_data_container.text("\n".join(raw_data_list[-20:]))  # Show last 20 lines
@@ -426,63 +446,54 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                     st.session_state.biometrics['raw_data'].append(line)
                     
                     # Process different metrics
-                    if line.startswith("GSR="):
-                        try:
-                            gsr = int(line.split('=')[1].split()[0])
-                            st.session_state.biometrics['gsr'].append(gsr)
-                            st.session_state.biometrics['time'].append(elapsed)
-                            
-                            with gsr_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>GSR</h3>
-                                    <h1>{gsr} µS</h1>
-                                    <p>Baseline: {baseline_gsr:.1f} µS</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # Stress assessment
-                                if abs(gsr - baseline_gsr) < 50:
-                                    status_card.success("😊 Normal Stress Levels")
-                                elif abs(gsr - baseline_gsr) < 150:
-                                    status_card.warning("😐 Elevated Stress")
-                                else:
-                                    status_card.error("😨 High Stress Alert")
+                    kind, value = parser.parse(line)
+                    if kind == 'gsr':
+                        gsr = int(value)
+                        st.session_state.biometrics['gsr'].append(gsr)
+                        st.session_state.biometrics['time'].append(elapsed)
                         
-                        except:
-                            continue
-                    
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse = int(line.split(':')[1])
-                            st.session_state.biometrics['pulse'].append(pulse)
+                        with gsr_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>GSR</h3>
+                                <h1>{gsr} µS</h1>
+                                <p>Baseline: {baseline_gsr:.1f} µS</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                             
-                            with pulse_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>Heart Rate</h3>
-                                    <h1>{pulse} BPM</h1>
-                                    <p>Baseline: {baseline_pulse:.1f} BPM</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        except:
-                            continue
+                            # Stress assessment
+                            if abs(gsr - baseline_gsr) < 50:
+                                status_card.success("😊 Normal Stress Levels")
+                            elif abs(gsr - baseline_gsr) < 150:
+                                status_card.warning("😐 Elevated Stress")
+                            else:
+                                status_card.error("😨 High Stress Alert")
                     
-                    elif line.startswith("O2:"):
-                        try:
-                            oxygen = float(line.split(':')[1].replace('%', ''))
-                            st.session_state.biometrics['oxygen'].append(oxygen)
-                            
-                            with oxygen_card.container():
-                                st.markdown(f"""
-                                <div class="metric-card">
-                                    <h3>Oxygen Saturation</h3>
-                                    <h1>{oxygen}%</h1>
-                                    <p>Baseline: {baseline_oxygen:.1f}%</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        except:
-                            continue
+                    elif kind == 'pulse':
+                        pulse = int(value)
+                        st.session_state.biometrics['pulse'].append(pulse)
+                        
+                        with pulse_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>Heart Rate</h3>
+                                <h1>{pulse} BPM</h1>
+                                <p>Baseline: {baseline_pulse:.1f} BPM</p>
+                            </div>
+                            """, unsafe_allow_html=True)
+                    
+                    elif kind == 'oxygen':
+                        oxygen = value
+                        st.session_state.biometrics['oxygen'].append(oxygen)
+                        
+                        with oxygen_card.container():
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <h3>Oxygen Saturation</h3>
+                                <h1>{oxygen}%</h1>
+                                <p>Baseline: {baseline_oxygen:.1f}%</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                 
                 # Update raw data display
                 raw_data_container.text("\n".join(raw_data_list[-20:]))
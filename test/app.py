@@ -660,14 +660,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
 import time
-import serial
-import serial.tools.list_ports
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from olympic_data import load_athlete_events
+from line_protocol import LineParser
 
 st.title("Olympics Dataset Analytics + Biometric Monitoring")
 
@@ -713,7 +711,7 @@ if nav == 'Home':
         ''')
 
 # Load data
-data = pd.read_csv('athlete_events.csv')
+data = load_athlete_events('athlete_events.csv')
 p = pd.DataFrame(data)
 
 # Exploratory Data Analysis
@@ -746,6 +744,9 @@ if nav == 'Prediction':
 
 # Biometric Monitoring - Updated Version
 elif nav == 'Biometric Monitoring':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
     st.header("🏥 Real-Time Athlete Biometric Monitoring")
     st.write("""
     Monitor athletes' physiological data in real-time:
@@ -776,6 +777,7 @@ elif nav == 'Biometric Monitoring':
                 status_placeholder = st.empty()
                 chart_placeholder = st.empty()
                 raw_data_expander = st.expander("View Raw Serial Data")
+                malformed_placeholder = st.empty()
                 
                 # Data storage
                 metrics = {
@@ -786,63 +788,61 @@ elif nav == 'Biometric Monitoring':
                 }
                 
                 start_time = time.time()
+                parser = LineParser()
                 
                 # Monitoring loop
                 while True:
                     if ser.in_waiting > 0:
-                        line = ser.readline().decode('utf-8').strip()
-                        raw_data_expander.write(line)
+                        raw = ser.readline()
+                        raw_data_expander.write(raw.decode('utf-8', errors='replace').strip())
+                        kind, value = parser.parse(raw)
+                        if parser.malformed:
+                            malformed_placeholder.caption(f"⚠️ {parser.malformed} malformed line(s) skipped")
                         
                         # Process GSR data
-                        if line.startswith("GSR="):
-                            try:
-                                gsr_value = int(line.split('=')[1].split()[0])
-                                metrics['GSR'].append(gsr_value)
-                                metrics['Time'].append(time.time() - start_time)
-                                
-                                # Update display
-                                gsr_placeholder.metric(
-                                    "GSR (µS)", 
-                                    f"{gsr_value}",
-                                    help="Galvanic Skin Response - Higher values indicate more stress"
-                                )
-                                
-                                # Classify stress
-                                if gsr_value <= 100:
-                                    status_placeholder.success("😊 Low Stress")
-                                elif gsr_value <= 200:
-                                    status_placeholder.warning("😐 Moderate Stress")
-                                else:
-                                    status_placeholder.error("😨 High Stress")
-                                    
-                            except Exception as e:
-                                st.warning(f"GSR parsing error: {str(e)}")
+                        if kind == 'gsr':
+                            gsr_value = int(value)
+                            metrics['GSR'].append(gsr_value)
+                            metrics['Time'].append(time.time() - start_time)
+                            
+                            # Update display
+                            gsr_placeholder.metric(
+                                "GSR (µS)", 
+                                f"{gsr_value}",
+                                help="Galvanic Skin Response - Higher values indicate more stress"
+                            )
+                            
+                            # Classify stress
+                            if gsr_value <= 100:
+                                status_placeholder.success("😊 Low Stress")
+                            elif gsr_value <= 200:
+                                status_placeholder.warning("😐 Moderate Stress")
+                            else:
+                                status_placeholder.error("😨 High Stress")
                         
                         # Process Pulse data
-                        elif line.startswith("Pulse:"):
-                            try:
-                                pulse_value = int(line.split(':')[1])
-                                metrics['Pulse'].append(pulse_value)
-                                pulse_placeholder.metric(
-                                    "Heart Rate", 
-                                    f"{pulse_value} BPM",
-                                    help="Beats per minute - Normal range: 60-100 BPM"
-                                )
-                            except:
-                                continue
+                        elif kind == 'pulse':
+                            pulse_value = int(value)
+                            metrics['Pulse'].append(pulse_value)
+                            pulse_placeholder.metric(
+                                "Heart Rate", 
+                                f"{pulse_value} BPM",
+                                help="Beats per minute - Normal range: 60-100 BPM"
+                            )
                         
                         # Process O2 data
-                        elif line.startswith("O2:"):
-                            try:
-                                o2_value = float(line.split(':')[1].replace('%',''))
-                                metrics['Oxygen'].append(o2_value)
-                                o2_placeholder.metric(
-                                    "SpO₂", 
-                                    f"{o2_value}%",
-                                    help="Blood oxygen saturation - Normal range: 95-100%"
-                                )
-                            except:
-                                continue
+                        elif kind == 'oxygen':
+                            o2_value = value
+                            metrics['Oxygen'].append(o2_value)
+                            o2_placeholder.metric(
+                                "SpO₂", 
+                                f"{o2_value}%",
+                                help="Blood oxygen saturation - Normal range: 95-100%"
+                            )
+                        
+                        # Sensor not fitted / no fingers on the electrodes
+                        elif kind in ('nf', 'contact'):
+                            status_placeholder.info("✋ Place fingers on the sensor")
                         
                         # Update chart periodically
                         if len(metrics['Time']) % 5 == 0 and len(metrics['Time']) > 10:
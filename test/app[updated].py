@@ -1,12 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import seaborn as sns
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
 import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from olympic_data import CUBE_COLUMNS, dataset_version, load_athlete_events, load_medal_cubes, medal_rank, top_teams
+from model_registry import ModelRegistry, fingerprint
+from weight_predictor import fit, predict
 
 st.title("Olympics Dataset Analytics")
 
@@ -37,9 +38,14 @@ if nav == 'Home':
         }
         ''')
 
-data = pd.read_csv('athlete_events.csv')
+data = load_athlete_events('athlete_events.csv')
 p = pd.DataFrame(data)
 
+
+@st.cache_resource
+def get_model_registry():
+    return ModelRegistry()
+
 if nav == 'Exploratory Data Analysis':
     st.header('Exploratory Data Analysis')
 
@@ -83,8 +89,7 @@ if nav == 'Data Preprocessing':
         st.dataframe(p)
 
     if st.checkbox('Convert Medals to Numeric datatype and Remove Null Values'):
-        p['Medal'] = p.Medal.replace({'Gold': 1, 'Silver': 2, 'Bronze': 3})
-        p['Medal'] = p['Medal'].fillna(0)
+        p['Medal'] = medal_rank(p['Medal'])
         st.write(p)
 
     if st.checkbox("Updated Null Values"):
@@ -99,7 +104,12 @@ if nav == 'Data Preprocessing':
         st.write(p)
 
 if nav == 'Trends':
+    import matplotlib.pyplot as plt
+    import plotly.express as px
+    import seaborn as sns
     st.header('Trends')
+    # Medal counts by athlete/team/NOC/year/sport/sex, precomputed per dataset version
+    cubes = load_medal_cubes('athlete_events.csv')
 
     if st.checkbox("Analyze the relationship between the Height and Weights of an athlete"):
         graph = st.selectbox("What kind of Plot do you want?", ['Scatter Plot', 'Histogram'])
@@ -128,25 +138,16 @@ if nav == 'Trends':
         st.write(fig)
 
     if st.checkbox('Number of Medals Won by M and F'):
-        p['Medal'] = p.Medal.replace({'Gold': 1, 'Silver': 2, 'Bronze': 3}).fillna(0)
-        fig = px.histogram(p, x=p.Sex, color=p.Medal)
+        fig = px.bar(cubes['Sex'][CUBE_COLUMNS], labels={'value': 'Count', 'variable': 'Medal'})
         st.write(fig)
 
+    # Cubes are sorted by Total, so rankings are just the first rows
     if st.checkbox("Athletes with Most Medals"):
-        p['Medal'] = p.Medal.replace({'Gold': 1, 'Silver': 2, 'Bronze': 3}).fillna(0)
-        df = pd.get_dummies(p['Medal']).drop([0], axis=1)
-        df['Name'] = p['Name']
-        df['Total'] = df[1] + df[2] + df[3]
-        f = df.groupby(df['Name'])['Total'].sum().sort_values(ascending=False).head(10)
-        x = pd.DataFrame(f)
+        x = pd.DataFrame(cubes['Name']['Total'].head(10))
         st.write(x)
 
+    f = cubes['Team']['Total']
     if st.checkbox("Countries with Most Medals"):
-        p['Medal'] = p.Medal.replace({'Gold': 1, 'Silver': 2, 'Bronze': 3}).fillna(0)
-        df = pd.get_dummies(p['Medal']).drop([0], axis=1)
-        df['Team'] = p['Team']
-        df['Total'] = df[1] + df[2] + df[3]
-        f = df.groupby(df['Team'])['Total'].sum().sort_values(ascending=False)
         k = f.head(10)
         k = pd.DataFrame(k.index.values)
         st.write(k)
@@ -154,7 +155,8 @@ if nav == 'Trends':
     st.subheader("Find whether your country is in the Zero-Medal list?")
     x = st.text_input('Enter')
     if st.checkbox('Show'):
-        if x not in f.index.values:
+        # Index membership is a hash lookup; .values would scan every team
+        if x not in f.index:
             st.write('Country not listed in the dataset')
         else:
             st.write('Medals:', f[x])
@@ -163,10 +165,10 @@ if nav == 'Trends':
         number = st.number_input('Insert the Leap Year', 1896.00, 2016.00, step=4.00)
         max_year = int(number)
         if st.button('Show'):
-            team_list = p[(p.Year == max_year) & (p.Medal == 'Gold')].Team
-            if len(team_list) != 0:
-                sns.barplot(x=team_list.value_counts().head(),
-                            y=team_list.value_counts().head().index)
+            # One slice of the (Year, Medal) index instead of a scan over every row
+            top_gold = top_teams(cubes, max_year, 'Gold')
+            if len(top_gold) != 0:
+                sns.barplot(x=top_gold.values, y=top_gold.index)
                 st.pyplot()
             else:
                 st.write('Enter valid year')
@@ -175,16 +177,12 @@ if nav == 'Prediction':
     st.header('Prediction')
 
     st.subheader('Predict the Weight of an athlete with his/her Height')
-    model = LinearRegression()
-    p['Height'] = p['Height'].fillna(p.Height.mean())
-    p['Weight'] = p['Weight'].fillna(p.Weight.mean())
-    x = np.array(p['Height']).reshape(-1, 1)
-    y = np.array(p['Weight']).reshape(-1, 1)
-    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2)
-    model.fit(x_train, y_train)
+    # Fitted once per dataset version, on mean-filled heights and weights
+    model = get_model_registry().get('height_weight_filled_ols', dataset_version('athlete_events.csv'),
+                                     lambda: fit(p['Height'].fillna(p.Height.mean()),
+                                                 p['Weight'].fillna(p.Weight.mean())))
     t = st.number_input('Enter the Height')
-    t = np.array(t).reshape(-1, 1)
-    d = model.predict(t)
+    d = predict(model, [t])
     if st.button('Predict Weight'):
         st.write(d)
 
@@ -199,14 +197,10 @@ if nav == 'Prediction':
              "Corresponding Sport": ['Marathon', 'Basketball', 'Rugby', 'Shot Put']}
         st.write(pd.DataFrame(q))
 
-    model1 = LinearRegression()
-    j = np.array(k['BMI']).reshape(-1, 1)
-    l = np.array(k['Sport']).reshape(-1, 1)
-    j_train, j_test, l_train, l_test = train_test_split(j, l, test_size=0.3)
-    model1.fit(j_train, l_train)
+    model1 = get_model_registry().get('bmi_sport_ols', fingerprint(k['BMI'], k['Sport']),
+                                      lambda: fit(k['BMI'], k['Sport']))
     t = st.number_input('Enter BMI')
-    t = np.array(t).reshape(-1, 1)
-    d = model1.predict(t)
+    d = predict(model1, t)
     d = d * 10
     d = np.round(d)
 
@@ -2,13 +2,13 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
-import serial
-import serial.tools.list_ports
 from datetime import datetime
-import plotly.express as px
-import qrcode
 from io import BytesIO
 import base64
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from line_protocol import LineParser
 
 # Configure page
 st.set_page_config(
@@ -66,6 +66,8 @@ st.title("Health Biometric Monitoring")
 
 # Function to generate QR code
 def generate_qr_code(data):
+    import qrcode
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -266,6 +268,9 @@ Date: {user['Date']}\n\n"""
 
 # Biometric Monitoring Page
 elif nav == '💓 Stress-O2-Pulse Monitoring':
+    import serial
+    import serial.tools.list_ports
+    import plotly.express as px
     st.header("🏥 Real-Time Biometric Monitoring")
     st.write("""
     Monitor physiological data in real-time:
@@ -331,6 +336,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         chart_placeholder = st.empty()
         raw_data_expander = st.expander("View Raw Serial Data")
         raw_data_placeholder = raw_data_expander.empty()
+        malformed_placeholder = raw_data_expander.empty()
         
         # Start/Stop buttons
         col1, col2 = st.columns(2)
@@ -339,6 +345,7 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
                 if st.button("▶ Start Real-Time Monitoring"):
                     try:
                         st.session_state.serial_conn = serial.Serial(selected_port, 9600, timeout=1)
+                        st.session_state.line_parser = LineParser()
                         st.session_state.monitoring_active = True
                         st.session_state.start_time = time.time()
                         st.session_state.metrics = {
@@ -361,59 +368,52 @@ elif nav == '💓 Stress-O2-Pulse Monitoring':
         if st.session_state.monitoring_active and st.session_state.serial_conn:
             try:
                 if st.session_state.serial_conn.in_waiting > 0:
-                    line = st.session_state.serial_conn.readline().decode('utf-8').strip()
-                    raw_data_placeholder.text(line)
+                    raw = st.session_state.serial_conn.readline()
+                    raw_data_placeholder.text(raw.decode('utf-8', errors='replace').strip())
                     
                     # Process GSR data
-                    if line.startswith("GSR="):
-                        try:
-                            gsr_value = int(line.split('=')[1].split()[0])
-                            st.session_state.metrics['GSR'].append(gsr_value)
-                            st.session_state.metrics['Time'].append(time.time() - st.session_state.start_time)
-                            
-                            # Update display
-                            gsr_placeholder.metric(
-                                "GSR (µS)", 
-                                f"{gsr_value}",
-                                help="Galvanic Skin Response - Higher values indicate more stress"
-                            )
-                            
-                            # Classify stress
-                            if gsr_value <= 100:
-                                status_placeholder.success("😊 Low Stress")
-                            elif gsr_value <= 200:
-                                status_placeholder.warning("😐 Moderate Stress")
-                            else:
-                                status_placeholder.error("😨 High Stress")
-                                
-                        except Exception as e:
-                            st.warning(f"GSR parsing error: {str(e)}")
+                    kind, value = st.session_state.line_parser.parse(raw)
+                    if st.session_state.line_parser.malformed:
+                        malformed_placeholder.caption(f"⚠️ {st.session_state.line_parser.malformed} malformed line(s) skipped")
+                    if kind == 'gsr':
+                        gsr_value = int(value)
+                        st.session_state.metrics['GSR'].append(gsr_value)
+                        st.session_state.metrics['Time'].append(time.time() - st.session_state.start_time)
+                        
+                        # Update display
+                        gsr_placeholder.metric(
+                            "GSR (µS)", 
+                            f"{gsr_value}",
+                            help="Galvanic Skin Response - Higher values indicate more stress"
+                        )
+                        
+                        # Classify stress
+                        if gsr_value <= 100:
+                            status_placeholder.success("😊 Low Stress")
+                        elif gsr_value <= 200:
+                            status_placeholder.warning("😐 Moderate Stress")
+                        else:
+                            status_placeholder.error("😨 High Stress")
                     
                     # Process Pulse data
-                    elif line.startswith("Pulse:"):
-                        try:
-                            pulse_value = int(line.split(':')[1])
-                            st.session_state.metrics['Pulse'].append(pulse_value)
-                            pulse_placeholder.metric(
-                                "Heart Rate", 
-                                f"{pulse_value} BPM",
-                                help="Beats per minute - Normal range: 60-100 BPM"
-                            )
-                        except:
-                            pass
+                    elif kind == 'pulse':
+                        pulse_value = int(value)
+                        st.session_state.metrics['Pulse'].append(pulse_value)
+                        pulse_placeholder.metric(
+                            "Heart Rate", 
+                            f"{pulse_value} BPM",
+                            help="Beats per minute - Normal range: 60-100 BPM"
+                        )
                     
                     # Process O2 data
-                    elif line.startswith("O2:"):
-                        try:
-                            o2_value = float(line.split(':')[1].replace('%',''))
-                            st.session_state.metrics['Oxygen'].append(o2_value)
-                            o2_placeholder.metric(
-                                "SpO₂", 
-                                f"{o2_value}%",
-                                help="Blood oxygen saturation - Normal range: 95-100%"
-                            )
-                        except:
-                            pass
+                    elif kind == 'oxygen':
+                        o2_value = value
+                        st.session_state.metrics['Oxygen'].append(o2_value)
+                        o2_placeholder.metric(
+                            "SpO₂", 
+                            f"{o2_value}%",
+                            help="Blood oxygen saturation - Normal range: 95-100%"
+                        )
                     
                     # Update chart periodically
                     if len(st.session_state.metrics['Time']) > 1 and len(st.session_state.metrics['Time']) % 5 == 0:
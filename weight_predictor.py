@@ -0,0 +1,70 @@
+import math
+import statistics
+
+import numpy as np
+
+
+# One-feature least-squares line (e.g. height -> weight), fitted in closed form.
+# slope = Sxy / Sxx and intercept = mean(y) - slope * mean(x), so fitting is a
+# few reductions over the data and scoring is one multiply-add per row, for a
+# single height or a whole squad at once. The fitted model is a small dict of
+# floats, which ModelRegistry stores as JSON.
+
+def fit(x, y):
+    """Fit y = coef * x + intercept; rows missing either value are left out."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    known = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[known], y[known]
+    n = len(x)
+    if n < 3:
+        raise ValueError("need at least 3 rows with both values to fit a line")
+
+    x_mean, y_mean = x.mean(), y.mean()
+    dx, dy = x - x_mean, y - y_mean
+    sxx, sxy, syy = float(dx @ dx), float(dx @ dy), float(dy @ dy)
+    if sxx == 0:
+        raise ValueError("x is constant, the slope is undefined")
+    coef = sxy / sxx
+    sse = max(syy - coef * sxy, 0.0)
+    return {
+        'coef': coef,
+        'intercept': float(y_mean - coef * x_mean),
+        'r2': 1 - sse / syy if syy else 1.0,
+        'n_train': n,
+        # Needed for prediction intervals
+        'x_mean': float(x_mean),
+        'sxx': sxx,
+        'sigma': math.sqrt(sse / (n - 2)),
+    }
+
+
+def predict(model, x):
+    return model['coef'] * np.asarray(x, dtype=float) + model['intercept']
+
+
+def _t_quantile(p, df):
+    # Student t quantile from the normal one (Cornish-Fisher expansion);
+    # within 0.01 of the exact value from 5 degrees of freedom up
+    z = statistics.NormalDist().inv_cdf(p)
+    return (z + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+def predict_interval(model, x, level=0.95):
+    """Predictions with a prediction interval for each x; returns (y, lower, upper)."""
+    x = np.asarray(x, dtype=float)
+    y = predict(model, x)
+    n = model['n_train']
+    t = _t_quantile(0.5 + level / 2, n - 2)
+    half = t * model['sigma'] * np.sqrt(1 + 1 / n + (x - model['x_mean']) ** 2 / model['sxx'])
+    return y, y - half, y + half
+
+
+def score(model, frame, column='Height', target='Weight', level=0.95):
+    # frame with predicted target and interval columns added, e.g. for a squad CSV
+    y, lower, upper = predict_interval(model, frame[column], level)
+    return frame.assign(**{f'Predicted {target}': y,
+                           f'{target} Low': lower,
+                           f'{target} High': upper})